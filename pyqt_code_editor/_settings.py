@@ -13,6 +13,8 @@ class SettingProperty:
     like normal attributes (settings.font_size) while providing custom behavior
     when they are accessed or modified.
     """
+    __slots__ = ('name', 'default_value', 'category')
+    
     def __init__(self, default_value, category: str = "General"):
         self.name = None  # Will be set when the class is created
         self.default_value = default_value
@@ -109,11 +111,14 @@ class Settings(QObject):
     # Project explorer
     max_files = SettingProperty(1000, "ProjectExplorer")
     ignored_folders = SettingProperty(['.git'], "ProjectExplorer")
+    preserve_metadata_on_paste = SettingProperty(True, "ProjectExplorer")
     
     # Completions
     max_completions = SettingProperty(5, "Completion")
     full_completion_delay = SettingProperty(250, "Completion")
     hide_completion_delay = SettingProperty(500, "Completion")
+    # The number of parsed jedi scripts that the worker keeps for reuse
+    jedi_script_cache_size = SettingProperty(4, "Completion")
     
     # Code checking
     check_debounce_delay = SettingProperty(500, "Checking")
@@ -133,6 +138,11 @@ class Settings(QObject):
     codestral_api_key = SettingProperty(os.environ.get('CODESTRAL_API_KEY', ''), "Codestral")
     codestral_url = SettingProperty('https://codestral.mistral.ai', "Codestral")
     codestral_timeout = SettingProperty(5000, "Codestral")
+    # Single-line codestral completion is skipped when jedi finds at least this
+    # many completions (0 means never skip). Jedi only returns completions that
+    # match the word being typed, so any non-zero value trades codestral's
+    # suggestions for speed whenever jedi has enough matches.
+    codestral_skip_threshold = SettingProperty(0, "Codestral")
     
     # Window geometry
     window_geometry = SettingProperty('', "Window")
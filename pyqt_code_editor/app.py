@@ -445,15 +445,30 @@ class SigmundAnalyst(QMainWindow):
         super().closeEvent(event)
 
     def _show_quick_open(self):
-        """Show a dialog with all files in the project, filtered as user types."""
-        file_list = []
-        for project_explorer in self._project_explorers:
-            file_list.extend(project_explorer.list_files())
+        """Show a dialog with all files in the project, filtered as user types.
+        The dialog is shown right away, and the files are added once all
+        project explorers have listed them. Listing happens in the background
+        unless the explorers have a fresh list cached.
+        """
         dlg = QuickOpenFileDialog(
             parent=self,
-            file_list=file_list,
+            file_list=None,
             open_file_callback=self._editor_panel.open_file,
         )
+        project_explorers = list(self._project_explorers)
+        file_lists = [None] * len(project_explorers)
+
+        def add_file_list(i, files):
+            file_lists[i] = files
+            if all(files is not None for files in file_lists):
+                dlg.set_file_list([path for files in file_lists
+                                   for path in files])
+
+        if not project_explorers:
+            dlg.set_file_list([])
+        for i, project_explorer in enumerate(project_explorers):
+            project_explorer.list_files_in_background(
+                lambda files, i=i: add_file_list(i, files))
         dlg.exec_()
             
             
@@ -1,14 +1,14 @@
 from qtpy.QtWidgets import (QTabWidget, QWidget, QToolButton, QMenu,
-                            QAction, QHBoxLayout)
-from qtpy.QtCore import Signal
+                            QHBoxLayout)
+from qtpy.QtCore import Signal, QTimer
 import qtawesome as qta
 import sys
+import threading
 import logging
 from ...environment_manager import environment_manager
 from ...themes import HORIZONTAL_SPACING
 from ...widgets import Dock
 from .jupyter_console_tab import JupyterConsoleTab
-from .kernel_spec_manager import HomeAwareKernelSpecManager
 logger = logging.getLogger(__name__)
 
 
@@ -17,6 +17,10 @@ class JupyterConsole(Dock):
     
     execution_complete = Signal(str, object)
     workspace_updated = Signal(dict)
+    # Emitted from a background thread when the kernel specs have been
+    # reloaded. Because the signal crosses threads, the connected slot is
+    # called in the main thread.
+    kernel_specs_reloaded = Signal(dict)
     
     def __init__(self, parent=None, default_kernel='python3'):
         super().__init__("Jupyter Console", parent)
@@ -71,11 +75,27 @@ class JupyterConsole(Dock):
         # ---------------------------------------------------------------------
         self.kernel_menu = QMenu(self.kernel_button)
         self.kernel_button.setMenu(self.kernel_menu)
-        self.refresh_kernel_menu()
+        # A single connection handles all kernel actions, so that the actions
+        # don't need to be connected each time the menu is rebuilt
+        self.kernel_menu.triggered.connect(self.kernel_menu_triggered)
+        self.kernel_specs_reloaded.connect(self._populate_kernel_menu)
         
         # ---------------------------------------------------------------------
         # Start with a default kernel
         # ---------------------------------------------------------------------
+        # The kernel menu and the default console tab need jupyter_client,
+        # qtconsole and zmq, which take long to import, and the kernel itself
+        # takes long to start. This is therefore done once control returns to
+        # the event loop, so that the main window is shown first. If a console
+        # is needed before then, it is started right away.
+        self._started = False
+        QTimer.singleShot(0, self._start)
+    
+    def _start(self):
+        if self._started:
+            return
+        self._started = True
+        self.refresh_kernel_menu()
         self.add_console_tab(self.default_kernel)
     
     # -------------------------------------------------------------------------
@@ -98,24 +118,44 @@ class JupyterConsole(Dock):
     # Kernel handling
     # -------------------------------------------------------------------------
     def refresh_kernel_menu(self):
-        """Refresh the list of available kernels and rebuild the kernel menu."""
-        self.kernel_menu.clear()
+        """Refresh the list of available kernels and rebuild the kernel menu.
+        The kernel specs are cached, so that they are retrieved only the first
+        time.
+        """
+        # jupyter_client takes long to import, so it is only imported when
+        # the kernel specs are needed
+        from .kernel_spec_manager import get_kernel_specs
+        self._populate_kernel_menu(get_kernel_specs())
         
-        # Get available kernelspecs
-        kernel_spec_manager = HomeAwareKernelSpecManager()
-        self.available_kernels = kernel_spec_manager.get_all_specs()
+    def reload_kernel_specs(self):
+        """Reload the kernel specs in a background thread, so that the user
+        interface doesn't block while the kernel directories are scanned. The
+        kernel menu is rebuilt when the specs have been reloaded.
+        """
+        from .kernel_spec_manager import get_kernel_specs
+        threading.Thread(
+            target=lambda: self.kernel_specs_reloaded.emit(
+                get_kernel_specs(reload=True)),
+            daemon=True).start()
+    
+    def _populate_kernel_menu(self, kernel_specs):
+        self.kernel_menu.clear()
+        self.available_kernels = kernel_specs
         self.fallback_kernel = list(self.available_kernels.keys())[0]
         for spec_name, spec in self.available_kernels.items():
             display_name = spec['spec']['display_name']
-            action = QAction(display_name, self)
-            action.setData(spec_name)
-            action.triggered.connect(self.kernel_menu_triggered)
-            self.kernel_menu.addAction(action)
+            self.kernel_menu.addAction(display_name).setData(spec_name)
+        self.kernel_menu.addSeparator()
+        # The refresh action has no data, which distinguishes it from the
+        # kernel actions
+        self.kernel_menu.addAction("Refresh kernels")
     
-    def kernel_menu_triggered(self):
-        action = self.sender()
-        if action:
-            self.add_console_tab(action.data())
+    def kernel_menu_triggered(self, action):
+        spec_name = action.data()
+        if spec_name is None:
+            self.reload_kernel_specs()
+        else:
+            self.add_console_tab(spec_name)
     
     def add_console_tab(self, kernel_name):
         """Add a new console tab with the specified kernel.
@@ -151,6 +191,7 @@ class JupyterConsole(Dock):
                 self.add_console_tab(self.default_kernel)
     
     def get_current_console(self):
+        self._start()
         return self.tab_widget.currentWidget()
     
     def restart_current_kernel(self):
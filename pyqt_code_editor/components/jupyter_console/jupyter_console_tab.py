@@ -1,7 +1,5 @@
 from qtpy.QtWidgets import QWidget, QVBoxLayout
 from qtpy.QtCore import Signal, QTimer
-from qtconsole.rich_jupyter_widget import RichJupyterWidget
-from qtconsole.manager import QtKernelManager
 import os
 import logging
 import uuid
@@ -11,6 +9,59 @@ from ... import settings
 from ...themes import THEMES, OUTER_CONTENT_MARGINS
 from ... import watchdog
 logger = logging.getLogger(__name__)
+# Stream output that arrives within this many milliseconds is passed on to the
+# console widget as a single message
+STREAM_FLUSH_INTERVAL = 16
+# While a tab is hidden, stream output is held back until the tab is shown
+# again, unless more than this many characters are pending
+HIDDEN_STREAM_BUFFER_SIZE = 1024 * 1024
+# The IOPub message types that carry output, mapped to a function that
+# extracts the output text from the message content
+OUTPUT_EXTRACTORS = {
+    'execute_result': lambda content: content.get('data', {}).get(
+        'text/plain', ''),
+    'stream': lambda content: content.get('text', ''),
+    'display_data': lambda content: str(content.get('data', {}).get(
+        'text/plain', '')),
+    'error': lambda content: '\n'.join(content.get('traceback', []))
+}
+# Stylesheets are built once per combination of color scheme, font size, and
+# font family
+stylesheet_cache = {}
+
+
+def get_stylesheet(color_scheme, font_size, font_family):
+    """Returns the stylesheet for the console widget. The stylesheet is
+    collapsed onto a single line to keep the input for Qt's parser small.
+    """
+    key = color_scheme, font_size, font_family
+    if key in stylesheet_cache:
+        return stylesheet_cache[key]
+    background_color = THEMES[color_scheme].background_color
+    stylesheet = f'''QPlainTextEdit, QTextEdit {{
+            background-color: '{background_color}';
+            background-clip: padding;
+            color: white;
+            font-size: {font_size}pt;
+            font-family: '{font_family}';
+            selection-background-color: #555;
+        }}
+        .inverted {{
+            background-color: white;
+            color: black;
+        }}
+        .error {{ color: red; }}
+        .in-prompt-number {{ font-weight: bold; }}
+        .out-prompt-number {{ font-weight: bold; }}
+        .in-prompt,
+        .in-prompt-number {{ color: lime; }}
+        .out-prompt,
+        .out-prompt-number {{ color: red; }}
+    '''
+    stylesheet = ' '.join(line.strip() for line in stylesheet.splitlines()
+                          if line.strip())
+    stylesheet_cache[key] = stylesheet
+    return stylesheet
 
 
 class JupyterConsoleTab(QWidget):
@@ -35,16 +86,37 @@ class JupyterConsoleTab(QWidget):
         self._updating_workspace = False
         # Dictionary to accumulate outputs per message ID
         self._accumulated_outputs = {}
+        # Stream messages that have not been passed on to the console widget
+        # yet. These are flushed together by a timer, so that the widget
+        # doesn't need to process each chunk of a verbose output separately.
+        # While the tab is hidden, they are held back until the tab is shown.
+        self._pending_stream_messages = []
+        self._pending_stream_size = 0
+        self._visible = False
+        self._stream_flush_timer = QTimer(self)
+        self._stream_flush_timer.setSingleShot(True)
+        self._stream_flush_timer.setInterval(STREAM_FLUSH_INTERVAL)
+        self._stream_flush_timer.timeout.connect(self._flush_stream_messages)
+
+        # qtconsole and zmq take long to import, so they are only imported
+        # once a console is actually created
+        from qtconsole.rich_jupyter_widget import RichJupyterWidget
+        from qtconsole.manager import QtKernelManager
+        import zmq
 
         # Create Jupyter console widget
         self.jupyter_widget = RichJupyterWidget()
         self.layout.addWidget(self.jupyter_widget)
 
-        # Set up kernel - using out-of-process kernel
-        self.kernel_manager = QtKernelManager(kernel_name=self.kernel_name)
+        # Set up kernel - using out-of-process kernel. By default, each kernel
+        # manager and each client creates its own ZeroMQ context, each with its
+        # own I/O thread. All consoles share the global context instead.
+        zmq_context = zmq.Context.instance()
+        self.kernel_manager = QtKernelManager(kernel_name=self.kernel_name,
+                                              context=zmq_context)
         self.kernel_manager.start_kernel()
 
-        self.kernel_client = self.kernel_manager.client()
+        self.kernel_client = self.kernel_manager.client(context=zmq_context)
         self.kernel_client.start_channels()
 
         # Connect the console to the kernel
@@ -54,27 +126,8 @@ class JupyterConsoleTab(QWidget):
         # Set up output capture
         self._setup_output_interception()
         self.jupyter_widget.set_default_style(colors='linux')
-        background_color = THEMES[settings.color_scheme]['background_color']
-        stylesheet = f'''QPlainTextEdit, QTextEdit {{
-                background-color: '{background_color}';
-                background-clip: padding;
-                color: white;
-                font-size: {settings.font_size}pt;
-                font-family: '{settings.font_family}';
-                selection-background-color: #555;
-            }}
-            .inverted {{
-                background-color: white;
-                color: black;
-            }}
-            .error {{ color: red; }}
-            .in-prompt-number {{ font-weight: bold; }}
-            .out-prompt-number {{ font-weight: bold; }}
-            .in-prompt,
-            .in-prompt-number {{ color: lime; }}
-            .out-prompt,
-            .out-prompt-number {{ color: red; }}
-        '''
+        stylesheet = get_stylesheet(settings.color_scheme, settings.font_size,
+                                    settings.font_family)
         self.jupyter_widget.setStyleSheet(stylesheet)
         # Recent versions of Jupyter require setting the stylesheet also on the 
         # control and page control widget. But these may not exist in older 
@@ -102,98 +155,149 @@ class JupyterConsoleTab(QWidget):
         """Handle messages from the kernel's IOPub channel"""
         msg_type = msg.get('msg_type', '')
         content = msg.get('content', {})
-        parent_header = msg.get('parent_header', {})
-        msg_id = parent_header.get('msg_id')
+        msg_id = msg.get('parent_header', {}).get('msg_id')
+        # Only output messages have an extractor
+        extract_output = OUTPUT_EXTRACTORS.get(msg_type)
 
         # Check if this is a silent execution (output should be hidden)
         is_silent = msg_id in self._silent_messages
 
         # Check if this message is a response to a tracked request
         if msg_id in self._pending_messages:
-            # Handle responses for workspace queries
-            if msg_type == 'stream' and 'text' in content:
-                future = self._pending_messages[msg_id]
-                if not future.done():
-                    try:
-                        # Try to parse JSON output for workspace queries
-                        output = content['text'].strip()
-                        if output:
-                            try:
-                                data = json.loads(output)
-                                future.set_result(data)
-                            except json.JSONDecodeError:
-                                future.set_result(output)
-                    except Exception as e:
-                        logger.error(f"Error processing message: {e}")
-                        future.set_exception(e)
-
-            # Check if response is complete
-            elif msg_type == 'status' and content.get('execution_state') == 'idle':
-                # Message processing is complete
-                if msg_id in self._pending_messages:
-                    future = self._pending_messages[msg_id]
-                    # If the future is still not done, set an empty result
-                    if not future.done():
-                        future.set_result({})
-                    # Clean up
-                    self._cleanup_message_ids(msg_id)
+            self._handle_pending_message(msg_id, msg_type, content)
 
         # Only process output for non-internal messages
         if msg_id not in self._internal_messages:
-            # Initialize accumulator for this message ID if needed
-            if msg_id and msg_id not in self._accumulated_outputs:
-                self._accumulated_outputs[msg_id] = {
-                    'text_parts': [],
-                    'contents': []
-                }
-            
-            # Accumulate different types of output
-            if msg_type == 'execute_result':
-                data = content.get('data', {})
-                text_output = data.get('text/plain', '')
+            if extract_output is not None:
+                # Accumulate the output per message ID
                 if msg_id:
-                    self._accumulated_outputs[msg_id]['text_parts'].append(text_output)
-                    self._accumulated_outputs[msg_id]['contents'].append(content)
-
-            # Capture stdout/stderr/display_data/errors
-            elif msg_type in ('stream', 'display_data', 'error'):
-                if msg_type == 'stream':
-                    output = content.get('text', '')
-                elif msg_type == 'display_data':
-                    output = str(content.get('data', {}).get('text/plain', ''))
-                else:  # error
-                    output = '\n'.join(content.get('traceback', []))
-                
-                if msg_id:
-                    self._accumulated_outputs[msg_id]['text_parts'].append(output)
-                    self._accumulated_outputs[msg_id]['contents'].append(content)
-            
+                    accumulated = self._accumulated_outputs.get(msg_id)
+                    if accumulated is None:
+                        accumulated = self._accumulated_outputs[msg_id] = {
+                            'text_parts': [],
+                            'contents': []
+                        }
+                    accumulated['text_parts'].append(extract_output(content))
+                    accumulated['contents'].append(content)
             # Detect execution completion - EMIT ACCUMULATED OUTPUT HERE
             elif not is_silent and msg_type == 'status' and content.get('execution_state') == 'idle':
-                if msg_id and msg_id in self._accumulated_outputs:
-                    # Combine all accumulated outputs
-                    accumulated = self._accumulated_outputs[msg_id]
-                    combined_text = '\n'.join(accumulated['text_parts'])
-                    
-                    # Create a combined content dict with all parts
-                    combined_content = {
-                        'parts': accumulated['contents'],
-                        'msg_id': msg_id
-                    }
-                    
-                    # Emit once with all accumulated output
-                    self.execution_complete.emit(combined_text, combined_content)
-                    
-                    # Clean up accumulated output
-                    del self._accumulated_outputs[msg_id]
-                else:
-                    # No output was captured, emit empty
-                    self.execution_complete.emit('', {})
+                self._emit_accumulated_output(msg_id)
 
         # IMPORTANT: Only forward non-silent messages to the widget
-        if not is_silent or msg_type not in ('execute_result', 'display_data',
-                                             'stream', 'error'):
+        if not is_silent or extract_output is None:
+            self._forward_iopub_message(msg)
+
+    def _handle_pending_message(self, msg_id, msg_type, content):
+        """Handle responses for workspace queries and other tracked requests"""
+        if msg_type == 'stream' and 'text' in content:
+            future = self._pending_messages[msg_id]
+            if not future.done():
+                try:
+                    # Try to parse JSON output for workspace queries
+                    output = content['text'].strip()
+                    if output:
+                        try:
+                            data = json.loads(output)
+                            future.set_result(data)
+                        except json.JSONDecodeError:
+                            future.set_result(output)
+                except Exception as e:
+                    logger.error(f"Error processing message: {e}")
+                    future.set_exception(e)
+
+        # Check if response is complete
+        elif msg_type == 'status' and content.get('execution_state') == 'idle':
+            # Message processing is complete
+            future = self._pending_messages[msg_id]
+            # If the future is still not done, set an empty result
+            if not future.done():
+                future.set_result({})
+            # Clean up
+            self._cleanup_message_ids(msg_id)
+
+    def _emit_accumulated_output(self, msg_id):
+        """Emit all output of an execution at once, and clean it up"""
+        # Output is only accumulated for messages with an ID
+        accumulated = self._accumulated_outputs.pop(msg_id, None)
+        if accumulated is None or not accumulated['contents']:
+            # No output was captured, emit empty
+            self.execution_complete.emit('', {})
+            return
+        text_parts = accumulated['text_parts']
+        contents = accumulated['contents']
+        # Create a combined content dict with all parts
+        combined_content = {
+            'parts': contents,
+            'msg_id': msg_id
+        }
+        self.execution_complete.emit('\n'.join(text_parts), combined_content)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._visible = True
+        self._flush_stream_messages()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._visible = False
+
+    def _forward_iopub_message(self, msg):
+        """Passes a message on to the console widget. Stream messages are
+        held back briefly, or until the tab is shown if the tab is hidden, so
+        that they can be passed on together. Other messages first flush any
+        pending stream messages, so that the order of the output is preserved.
+        """
+        if msg.get('msg_type') != 'stream':
+            self._flush_stream_messages()
             self._original_iopub_handler(msg)
+            return
+        self._pending_stream_messages.append(msg)
+        self._pending_stream_size += len(msg['content'].get('text', ''))
+        if not self._visible:
+            if self._pending_stream_size > HIDDEN_STREAM_BUFFER_SIZE:
+                self._flush_stream_messages()
+            return
+        if not self._stream_flush_timer.isActive():
+            self._stream_flush_timer.start()
+
+    def _is_same_stream(self, msg1, msg2):
+        """Checks whether two stream messages belong to the same stream of the
+        same execution.
+        """
+        return msg1['content'].get('name') == msg2['content'].get('name') \
+            and msg1.get('parent_header', {}).get('msg_id') == \
+            msg2.get('parent_header', {}).get('msg_id')
+
+    def _flush_stream_messages(self):
+        """Passes all pending stream messages on to the console widget. Each
+        run of consecutive messages for the same execution and stream is
+        passed on as a single message.
+        """
+        self._stream_flush_timer.stop()
+        if not self._pending_stream_messages:
+            return
+        msgs = self._pending_stream_messages
+        self._pending_stream_messages = []
+        self._pending_stream_size = 0
+        start = 0
+        for i in range(1, len(msgs) + 1):
+            if i == len(msgs) or not self._is_same_stream(msgs[start],
+                                                          msgs[i]):
+                self._forward_stream_messages(msgs[start:i])
+                start = i
+
+    def _forward_stream_messages(self, msgs):
+        """Passes stream messages for the same execution and stream on to the
+        console widget as a single message.
+        """
+        if len(msgs) == 1:
+            self._original_iopub_handler(msgs[0])
+            return
+        last_msg = msgs[-1]
+        text = ''.join(msg['content'].get('text', '') for msg in msgs)
+        combined_msg = dict(last_msg)
+        combined_msg['content'] = dict(last_msg['content'], text=text)
+        self._original_iopub_handler(combined_msg)
 
     def _cleanup_message_ids(self, msg_id):
         """Clean up message IDs from tracking sets"""
@@ -339,8 +443,12 @@ print(json.dumps({result_var}))
 
     def change_directory(self, directory):
         """Change the kernel's working directory"""
-        if os.path.exists(directory):
-            code = f"import os\nos.chdir(r'{directory}')"
+        # os.chdir() only works for folders, so checking for existence alone
+        # isn't enough
+        if os.path.isdir(directory):
+            # json.dumps() gives a valid Python string literal for any path,
+            # including paths with quotes or trailing backslashes
+            code = f"import os; os.chdir({json.dumps(directory)})"
             self.execute_silently(code)
             return True
         return False    
@@ -363,5 +471,6 @@ print(json.dumps({result_var}))
 
     def shutdown_kernel(self):
         """Shutdown the kernel"""
+        self._flush_stream_messages()
         self.kernel_client.stop_channels()
         self.kernel_manager.shutdown_kernel()
\ No newline at end of file
@@ -2,6 +2,9 @@ import os
 from jupyter_client.kernelspec import KernelSpecManager
 import logging
 logger = logging.getLogger(__name__)
+# The kernel specs are cached for the lifetime of the process, because
+# retrieving them requires scanning all kernel directories
+kernel_specs_cache = None
 
 
 class HomeAwareKernelSpecManager(KernelSpecManager):
@@ -19,3 +22,15 @@ class HomeAwareKernelSpecManager(KernelSpecManager):
             if jupyter_kernel_dir not in dirs:
                 dirs.append(jupyter_kernel_dir)
         return dirs
+
+
+def get_kernel_specs(reload: bool = False) -> dict:
+    """Returns all available kernel specs. The specs are retrieved only once,
+    unless reload is True. Reloading doesn't touch any widgets, and can
+    therefore be done in a background thread.
+    """
+    global kernel_specs_cache
+    if kernel_specs_cache is None or reload:
+        logger.info('retrieving kernel specs')
+        kernel_specs_cache = HomeAwareKernelSpecManager().get_all_specs()
+    return kernel_specs_cache
@@ -1,5 +1,14 @@
 import os
+import sys
+import json
+import hashlib
+import tempfile
+import stat
 import shutil
+import functools
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 import logging
 from qtpy.QtWidgets import (
@@ -12,63 +21,316 @@ from qtpy.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QCheckBox,
-    QShortcut
+    QShortcut,
+    QFileIconProvider
 )
 from qtpy.QtCore import Qt, QDir, QModelIndex, QSortFilterProxyModel, QUrl, \
-    Signal
-from qtpy.QtWidgets import QFileSystemModel
-from qtpy.QtGui import QDesktopServices, QKeySequence
+    Signal, QFileSystemWatcher, QTimer, QStandardPaths
+from qtpy.QtGui import QDesktopServices, QKeySequence, QStandardItemModel, \
+    QStandardItem, QAction
 from pathspec import PathSpec
 from pathspec.patterns.gitwildmatch import GitWildMatchPattern
 from .. import settings, themes
+# send2trash is optional. If it is available, deleted files and folders are
+# moved to the trash, which is also much faster for large folders.
+try:
+    from send2trash import send2trash
+except ImportError:
+    send2trash = None
 
 logger = logging.getLogger(__name__)
+# The number of seconds for which the list of project files is reused. Changes
+# in expanded folders and changes made through the explorer itself invalidate
+# the list right away.
+FILE_LIST_CACHE_TTL = 10
+# Project files are listed by this many threads, but only if the root folder
+# contains at least this many subfolders
+SCAN_THREADS = 8
+SCAN_PARALLEL_MIN_SUBFOLDERS = 5
+# The listings of scanned folders are stored on disk, and reused as long as
+# the modification time of a folder doesn't change. Listings of folders that
+# changed less than FOLDER_LISTING_MIN_AGE nanoseconds ago are not stored,
+# because they may change again without affecting the modification time.
+# Increase FOLDER_LISTINGS_VERSION when the format of the stored listings
+# changes.
+FOLDER_LISTINGS_VERSION = 1
+FOLDER_LISTING_MIN_AGE = 2 * 10 ** 9
+# The ioctl request that clones a file on Linux file systems with copy-on-write
+# support, such as Btrfs and XFS
+FICLONE = 0x40049409
+
+def _is_dir(path):
+    """Checks whether path is a folder with a single stat call."""
+    try:
+        return stat.S_ISDIR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
 
-class LazyQFileSystemModel(QFileSystemModel):
-    """A QFileSystemModel that only fetches children for 'expanded' paths.
-    This prevents eagerly creating inotify watchers for large, collapsed directories.
+def _relative_path(path, root):
+    """Returns path relative to root. Paths inside root are handled by
+    slicing off the root, which is much faster than os.path.relpath(). This
+    requires both paths to be normalized in the same way, which is the case
+    for paths that are found by listing root.
     """
+    if path == root:
+        return ''
+    prefix_len = len(root) if root.endswith(os.sep) else len(root) + 1
+    if path.startswith(root) and path[prefix_len - 1] == os.sep:
+        return path[prefix_len:]
+    return os.path.relpath(path, root)
+
+
+def _fast_copy(src, dst, preserve_metadata=True):
+    """Copies a file like shutil.copy2(), but on Linux first tries to clone
+    the file. A clone shares the data with the original until either is
+    modified, so it is made without reading or writing the data. If cloning
+    isn't supported, the data is copied within the kernel with
+    os.copy_file_range(), which network file systems can do on the server.
+    If that fails too, the file is copied normally. Hard links are not used,
+    because then modifying the copy would also modify the original.
+
+    If preserve_metadata is False, only the permission bits are copied, like
+    shutil.copy(), which saves the calls that copy times and flags.
+    """
+    # These checks are done before dst is opened for writing, because that
+    # would truncate src if both are the same file, for example through a
+    # symlink. Only regular files are copied here. Others, such as named
+    # pipes, are left to shutil.copyfile(), which refuses to copy them rather
+    # than blocking while reading them.
+    src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        dst_stat = None
+    if dst_stat is not None and os.path.samestat(src_stat, dst_stat):
+        raise shutil.SameFileError(f'{src!r} and {dst!r} are the same file')
+    copied = False
+    if sys.platform.startswith('linux') and stat.S_ISREG(src_stat.st_mode):
+        import fcntl
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                except OSError:
+                    remaining = os.fstat(fsrc.fileno()).st_size
+                    # copy_file_range() may copy fewer bytes than requested.
+                    # If it copies nothing while bytes remain, the copy would
+                    # be truncated, so the file is copied normally instead.
+                    while remaining > 0:
+                        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(),
+                                               remaining)
+                        if not n:
+                            raise OSError('copy_file_range() stopped early')
+                        remaining -= n
+        except OSError:
+            pass
+        else:
+            copied = True
+    if not copied:
+        shutil.copyfile(src, dst)
+    if preserve_metadata:
+        shutil.copystat(src, dst)
+    else:
+        shutil.copymode(src, dst)
+    return dst
+
+
+class LazyDirModel(QStandardItemModel):
+    """A model that lists the contents of a folder tree. Folders are only
+    scanned (with os.scandir) when they are expanded, and their contents are
+    dropped again when they are collapsed. Only expanded folders are watched
+    for changes, which keeps the number of inotify watchers small for large
+    projects.
+
+    The contents of the root folder are top-level items. Folders that haven't
+    been scanned yet have no items, but report that they have children, so
+    that they can be expanded. The view then asks the model to fetch them.
+    """
+    PATH_ROLE = Qt.UserRole + 1
+    IS_DIR_ROLE = Qt.UserRole + 2
+    FETCHED_ROLE = Qt.UserRole + 3
+
+    directory_changed = Signal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._expanded_paths = set()
+        self._root_path = ''
+        # Maps the paths of all folders in the model to their items
+        self._dir_items = {}
+        self._icon_provider = QFileIconProvider()
+        self._folder_icon = self._icon_provider.icon(
+            QFileIconProvider.IconType.Folder)
+        self._file_icon = self._icon_provider.icon(
+            QFileIconProvider.IconType.File)
+        # Only the root and the expanded folders are watched. The watched
+        # paths are also tracked here, so that unwatched folders are never
+        # passed to the watcher.
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._watched_paths = set()
 
     def setRootPath(self, root):
-        idx = super().setRootPath(root)
-        # Ensure the root path is always considered expanded
+        if root == self._root_path:
+            return
+        self.clear()
+        if self._watched_paths:
+            self._watcher.removePaths(list(self._watched_paths))
+            self._watched_paths = set()
+        self._root_path = root
+        self._dir_items = {}
         if root:
-            self._expanded_paths.add(root)
-            # Force a fetch so we see the root directory contents
-            if idx.isValid() and super().canFetchMore(idx):
-                super().fetchMore(idx)
-        return idx
+            root_item = self.invisibleRootItem()
+            self._dir_items[root] = root_item
+            self._fetch(root_item, root)
+
+    def rootPath(self):
+        return self._root_path
+
+    def filePath(self, index):
+        if not index.isValid():
+            return ''
+        return index.data(self.PATH_ROLE) or ''
+
+    def isDir(self, index):
+        return bool(index.data(self.IS_DIR_ROLE))
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Folders are assumed to have children until they have been scanned,
+        # so that they can be expanded without reading them first
+        if self.canFetchMore(parent):
+            return True
+        return super().hasChildren(parent)
+
+    def canFetchMore(self, parent):
+        return (parent.isValid() and self.isDir(parent)
+                and not parent.data(self.FETCHED_ROLE))
+
+    def fetchMore(self, parent):
+        if self.canFetchMore(parent):
+            self._fetch(self.itemFromIndex(parent), self.filePath(parent))
 
     def notify_path_expanded(self, path):
-        self._expanded_paths.add(path)
-        # Manually trigger fetch
-        index = self.index(path)
-        if super().canFetchMore(index):
-            super().fetchMore(index)
+        # The view normally fetches a folder when it is expanded, but not if
+        # the folder is expanded programmatically while it is hidden
+        item = self._dir_items.get(path)
+        if item is not None and not item.data(self.FETCHED_ROLE):
+            self._fetch(item, path)
 
     def notify_path_collapsed(self, path):
-        if path in self._expanded_paths:
-            self._expanded_paths.remove(path)
-
-    def canFetchMore(self, index):
-        if not index.isValid():
-            return super().canFetchMore(index)
-        path = self.filePath(index)
-        # Only allow fetch if path is in expanded set
-        if path in self._expanded_paths:
-            return super().canFetchMore(index)
-        return False
+        item = self._dir_items.get(path)
+        if item is None or item is self.invisibleRootItem():
+            return
+        self._forget_children(path)
+        item.removeRows(0, item.rowCount())
+        item.setData(False, self.FETCHED_ROLE)
+        self._unwatch(path)
+
+    def _on_directory_changed(self, path):
+        if not _is_dir(path):
+            # The watcher drops removed folders by itself
+            self._watched_paths.discard(path)
+        else:
+            item = self._dir_items.get(path)
+            if item is not None:
+                self._refresh(item, path)
+        self.directory_changed.emit(path)
+
+    def _scan(self, path):
+        """Returns the visible entries of a folder as (name, path, is_dir)
+        tuples, with folders first and sorted by name, or None if the folder
+        cannot be read.
+        """
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    # Hidden files are not shown, just like QFileSystemModel
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    entries.append((entry.name, entry.path, is_dir))
+        except OSError as e:
+            logger.warning(f"Failed to list folder {path}: {e}")
+            return None
+        entries.sort(key=lambda entry: (not entry[2], entry[0].lower()))
+        return entries
+
+    def _fetch(self, item, path):
+        """Scans a folder for the first time and starts watching it."""
+        item.setData(True, self.FETCHED_ROLE)
+        self._refresh(item, path)
+        self._watch(path)
+
+    def _refresh(self, parent_item, path):
+        """Brings the children of a folder item in line with the folder on
+        disk. Existing items are kept, so that expanded subfolders stay
+        expanded.
+        """
+        entries = self._scan(path)
+        if entries is None:
+            return
+        # A folder that is scanned for the first time is filled with a single
+        # insertion, rather than one insertion per item
+        if not parent_item.rowCount():
+            parent_item.appendRows([self._create_item(*entry)
+                                    for entry in entries])
+            return
+        new_paths = {entry_path for _, entry_path, _ in entries}
+        for row in reversed(range(parent_item.rowCount())):
+            child_path = parent_item.child(row).data(self.PATH_ROLE)
+            if child_path not in new_paths:
+                self._forget(child_path)
+                parent_item.removeRow(row)
+        existing_paths = {parent_item.child(row).data(self.PATH_ROLE)
+                          for row in range(parent_item.rowCount())}
+        # Both the existing items and the entries are sorted in the same way,
+        # so new items can be inserted at the row of their entry
+        for row, (name, entry_path, is_dir) in enumerate(entries):
+            if entry_path not in existing_paths:
+                parent_item.insertRow(row, self._create_item(name, entry_path,
+                                                             is_dir))
+
+    def _create_item(self, name, path, is_dir):
+        item = QStandardItem(self._folder_icon if is_dir else self._file_icon,
+                             name)
+        item.setEditable(False)
+        item.setData(path, self.PATH_ROLE)
+        item.setData(is_dir, self.IS_DIR_ROLE)
+        if is_dir:
+            self._dir_items[path] = item
+        return item
+
+    def _forget(self, path):
+        """Stops tracking a folder and everything inside it."""
+        if self._dir_items.pop(path, None) is not None:
+            self._forget_children(path)
+            self._unwatch(path)
+
+    def _forget_children(self, path):
+        prefix = path + os.sep
+        for child_path in [p for p in self._dir_items if p.startswith(prefix)]:
+            del self._dir_items[child_path]
+            self._unwatch(child_path)
+
+    def _watch(self, path):
+        if path in self._watched_paths:
+            return
+        # Adding a watcher fails, for example, when the system's limit on the
+        # number of watchers has been reached. The folder is then still shown,
+        # but changes aren't picked up automatically.
+        if self._watcher.addPath(path):
+            self._watched_paths.add(path)
+        else:
+            logger.warning(f"Failed to watch folder {path}")
 
-    def fetchMore(self, index):
-        if not index.isValid():
-            return super().fetchMore(index)
-        path = self.filePath(index)
-        # Only do the actual fetch for expanded paths
-        if path in self._expanded_paths:
-            return super().fetchMore(index)
+    def _unwatch(self, path):
+        if path in self._watched_paths:
+            self._watched_paths.remove(path)
+            self._watcher.removePath(path)
 
 class GitignoreFilterProxyModel(QSortFilterProxyModel):
     """A QSortFilterProxyModel that hides paths ignored by .gitignore (when enabled).
@@ -122,11 +384,11 @@ class GitignoreFilterProxyModel(QSortFilterProxyModel):
         if source_model.isDir(index):
             return True
         # Ignore explicitly ignored folders
-        path_parts = Path(abs_path).parts
+        path_parts = abs_path.split(os.sep)
         if any(ignored in path_parts for ignored in settings.ignored_folders):
             return False
         # Compute relative path from the repository root
-        rel_path = os.path.relpath(abs_path, self.root_folder)
+        rel_path = _relative_path(abs_path, self.root_folder)
         # If matched by pathspec => it is ignored => filter out
         return not self.pathspec.match_file(rel_path)
 
@@ -152,6 +414,12 @@ class GitignoreFilterProxyModel(QSortFilterProxyModel):
 class ProjectExplorer(QDockWidget):
 
     closed = Signal(object)
+    # Emitted from a background thread when a deletion has finished, with the
+    # deleted path and an error message, which is empty if deletion succeeded
+    _deletion_finished = Signal(str, str)
+    # Emitted from a background thread when the project files have been
+    # scanned, with the generation of the file list (see below) and the files
+    _files_scanned = Signal(int, list)
 
     def __init__(self, editor_panel, root_path=None, parent=None):
         super().__init__(os.path.basename(root_path), parent)
@@ -161,14 +429,32 @@ class ProjectExplorer(QDockWidget):
         self._clipboard_operation = None  # 'cut' or 'copy'
         self._clipboard_source_path = None
 
-        # Underlying LazyQFileSystemModel
-        self._model = LazyQFileSystemModel(self)
+        # Underlying LazyDirModel
+        self._model = LazyDirModel(self)
+        self._model.directory_changed.connect(self._invalidate_file_list)
+        self._deletion_finished.connect(self._on_deletion_finished)
+        # The list of project files is cached, see list_files()
+        self._file_list_cache = None
+        self._file_list_cache_time = 0.0
+        # The generation is increased each time the cache is invalidated, so
+        # that the result of a background scan that was started before the
+        # invalidation isn't cached
+        self._file_list_generation = 0
+        self._file_list_callbacks = []
+        self._files_scanned.connect(self._on_files_scanned)
+        # The folder listings from the last scan, as (signature, listings)
+        self._folder_listings = None
 
         # Add a filter proxy to hide items from .gitignore if enabled
         self._filter_proxy = GitignoreFilterProxyModel(self)
         self._filter_proxy.setSourceModel(self._model)
 
         self._display_root = root_path or QDir.currentPath()
+        cache_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.GenericCacheLocation)
+        self._folder_listings_path = os.path.join(
+            cache_dir, 'sigmund-analyst', 'folder-listings',
+            hashlib.sha1(self._display_root.encode()).hexdigest() + '.json')
 
         # Create a container widget and layout, so we can have the treeview + an optional checkbox
         container_widget = QWidget(self)
@@ -180,7 +466,15 @@ class ProjectExplorer(QDockWidget):
         self._tree_view.setModel(self._filter_proxy)
         layout.addWidget(self._tree_view)
 
-        # Connect expanded/collapsed signals through the proxy => model
+        # Connect expanded/collapsed signals through the proxy => model. The
+        # changes are collected and passed on together when control returns
+        # to the event loop, so that a burst of changes (such as expanding
+        # all children) is handled in one go, and each path only once.
+        self._pending_tree_changes = {}
+        self._tree_change_timer = QTimer(self)
+        self._tree_change_timer.setSingleShot(True)
+        self._tree_change_timer.setInterval(0)
+        self._tree_change_timer.timeout.connect(self._apply_tree_changes)
         self._tree_view.expanded.connect(self._on_expanded_proxy)
         self._tree_view.collapsed.connect(self._on_collapsed_proxy)
 
@@ -210,28 +504,30 @@ class ProjectExplorer(QDockWidget):
 
         # Set up global keyboard shortcuts
         self._setup_shortcuts()
+        # The context menus are built once and reused for each right-click
+        self._setup_context_menus()
 
     def _setup_shortcuts(self):
         """Set up keyboard shortcuts for common actions."""
         shortcut_f2 = QShortcut(QKeySequence("F2"), self)
         shortcut_f2.setContext(Qt.WidgetWithChildrenShortcut)
-        shortcut_f2.activated.connect(lambda: self._handle_rename_shortcut())
+        shortcut_f2.activated.connect(self._handle_rename_shortcut)
         
         shortcut_delete = QShortcut(QKeySequence.Delete, self)
         shortcut_delete.setContext(Qt.WidgetWithChildrenShortcut)
-        shortcut_delete.activated.connect(lambda: self._handle_delete_shortcut())
+        shortcut_delete.activated.connect(self._handle_delete_shortcut)
         
         shortcut_cut = QShortcut(QKeySequence.Cut, self)
         shortcut_cut.setContext(Qt.WidgetWithChildrenShortcut)
-        shortcut_cut.activated.connect(lambda: self._handle_cut_shortcut())
+        shortcut_cut.activated.connect(self._handle_cut_shortcut)
         
         shortcut_copy = QShortcut(QKeySequence.Copy, self)
         shortcut_copy.setContext(Qt.WidgetWithChildrenShortcut)
-        shortcut_copy.activated.connect(lambda: self._handle_copy_shortcut())
+        shortcut_copy.activated.connect(self._handle_copy_shortcut)
         
         shortcut_paste = QShortcut(QKeySequence.Paste, self)
         shortcut_paste.setContext(Qt.WidgetWithChildrenShortcut)
-        shortcut_paste.activated.connect(lambda: self._handle_paste_shortcut())
+        shortcut_paste.activated.connect(self._handle_paste_shortcut)
 
     def _handle_rename_shortcut(self):
         """Handle F2 shortcut for rename."""
@@ -276,56 +572,246 @@ class ProjectExplorer(QDockWidget):
         if not self._clipboard_source_path:
             return
 
+        # _paste_file_or_folder() checks the target, and uses the containing
+        # folder if a file is selected
         if not self._tree_view.selectionModel().hasSelection():
             # Paste into root if nothing is selected
-            root_path = self._model.rootPath()
-            if os.path.isdir(root_path):
-                self._paste_file_or_folder(root_path)
+            self._paste_file_or_folder(self._model.rootPath())
         else:
             proxy_index = self._tree_view.selectionModel().currentIndex()
             source_index = self._filter_proxy.mapToSource(proxy_index)
             if source_index.isValid():
-                path = self._model.filePath(source_index)
-                if os.path.isdir(path):
-                    self._paste_file_or_folder(path)
-                else:
-                    # If a file is selected, use its directory
-                    self._paste_file_or_folder(os.path.dirname(path))
+                self._paste_file_or_folder(self._model.filePath(source_index))
 
     def list_files(self) -> list[str]:
         """Returns a list of all non-ignored files under the display root,
         applying the same .gitignore-based logic.
         If there are more than max_files files, returns empty list.
+        
+        The list is cached for FILE_LIST_CACHE_TTL seconds, so that repeatedly
+        opening the quick-open dialog doesn't walk the project each time.
         """
         if not self._display_root:
             return []
-
+        if not self._file_list_is_fresh():
+            self._file_list_cache = self._scan_files()
+            self._file_list_cache_time = time.monotonic()
+        return list(self._file_list_cache)
+
+    def list_files_in_background(self, callback):
+        """Calls callback with the same list that list_files() returns. If
+        the cached list is still fresh, this happens right away. Otherwise the
+        project is scanned in a background thread, and callback is called when
+        the scan is done.
+        """
+        if not self._display_root:
+            callback([])
+            return
+        if self._file_list_is_fresh():
+            callback(list(self._file_list_cache))
+            return
+        self._file_list_callbacks.append(callback)
+        # A scan is already running for earlier callbacks
+        if len(self._file_list_callbacks) > 1:
+            return
+        generation = self._file_list_generation
+        threading.Thread(
+            target=lambda: self._files_scanned.emit(generation,
+                                                    self._scan_files()),
+            daemon=True).start()
+
+    def _on_files_scanned(self, generation, files):
+        if generation == self._file_list_generation:
+            self._file_list_cache = files
+            self._file_list_cache_time = time.monotonic()
+        callbacks = self._file_list_callbacks
+        self._file_list_callbacks = []
+        for callback in callbacks:
+            callback(list(files))
+
+    def _file_list_is_fresh(self):
+        return self._file_list_cache is not None and \
+            time.monotonic() - self._file_list_cache_time < FILE_LIST_CACHE_TTL
+
+    def _invalidate_file_list(self, *args):
+        self._file_list_cache = None
+        self._file_list_generation += 1
+
+    def _scan_files(self) -> list[str]:
+        """Walks the display root with os.scandir, which avoids the extra
+        stat calls of os.walk, and collects all non-ignored files. Symlinked
+        folders are listed but not followed, just like os.walk does.
+
+        If the root contains enough subfolders, folders are listed by a pool
+        of threads, so that the latency of listing one folder overlaps with
+        that of others. This matters mostly for network drives and cold
+        caches. The files are returned in the same order either way.
+        """
+        root = os.path.normpath(self._display_root)
+        ignored_folders = set(settings.ignored_folders)
+        if ignored_folders.intersection(Path(root).parts):
+            return []
+        max_files = settings.max_files
+        signature = self._scan_signature(root, ignored_folders)
+        cached = self._load_folder_listings(signature)
+        # Maps folders to their (files, subfolders, mtime_ns) listing
+        listings = {root: self._list_folder(root, root, ignored_folders,
+                                            cached)}
+        n_files = len(listings[root][0])
+        subfolders = listings[root][1]
+        if len(subfolders) < SCAN_PARALLEL_MIN_SUBFOLDERS:
+            # A stack of folders that still need to be listed
+            folders = list(subfolders)
+            while folders and n_files <= max_files:
+                folder = folders.pop()
+                listings[folder] = self._list_folder(folder, root,
+                                                     ignored_folders, cached)
+                n_files += len(listings[folder][0])
+                folders.extend(listings[folder][1])
+        else:
+            with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+                pending = {pool.submit(self._list_folder, folder, root,
+                                       ignored_folders, cached): folder
+                           for folder in subfolders}
+                while pending and n_files <= max_files:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        folder = pending.pop(future)
+                        listings[folder] = future.result()
+                        n_files += len(listings[folder][0])
+                        for subfolder in listings[folder][1]:
+                            pending[pool.submit(self._list_folder, subfolder,
+                                                root, ignored_folders,
+                                                cached)] = subfolder
+                for future in pending:
+                    future.cancel()
+        if n_files > max_files:
+            logger.warning("Too many files in project")
+            return []
+        self._save_folder_listings(signature, listings)
+        # Collect the files depth-first, in the order in which folders are
+        # listed, just like os.walk does
         results = []
+        folders = [root]
+        while folders:
+            files, subfolders, _ = listings[folders.pop()]
+            results.extend(files)
+            folders.extend(reversed(subfolders))
+        return results
+
+    def _list_folder(self, folder, root, ignored_folders, cached):
+        """Lists a single folder, and returns the non-ignored files and the
+        subfolders that should be scanned as two lists, followed by the
+        modification time of the folder (or None if the listing shouldn't be
+        reused). If the folder hasn't changed since it was listed in cached,
+        the cached listing is returned. This is called from worker threads,
+        and therefore doesn't touch any widgets.
+        """
+        files = []
+        subfolders = []
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            return files, subfolders, None
+        listing = cached.get(folder)
+        if listing is not None and listing[2] == mtime_ns:
+            return listing
+        if time.time_ns() - mtime_ns < FOLDER_LISTING_MIN_AGE:
+            mtime_ns = None
         gitignore_enabled = self._filter_proxy.gitignore_enabled
         pathspec = self._filter_proxy.pathspec
-        # Recursively walk the filesystem from _display_root
-        for dirpath, dirnames, filenames in os.walk(self._display_root):
-            path_parts = Path(dirpath).parts
-            if any(ignored in path_parts for ignored in settings.ignored_folders):
+        try:
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            return files, subfolders, None
+        # All files in the folder share the same relative folder, so the
+        # relative paths can be built by concatenation, rather than by calling
+        # os.path.relpath() for each file
+        rel_folder = _relative_path(folder, root)
+        if rel_folder:
+            rel_folder += os.sep
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if entry.name not in ignored_folders and \
+                        not entry.is_symlink():
+                    subfolders.append(entry.path)
                 continue
-            # Now gather files that are not ignored
-            for f in filenames:
-                abs_file = os.path.normpath(os.path.join(dirpath, f))
-                # Avoid filtering _display_root, though it shouldn't typically be a file
-                if abs_file == self._display_root:
-                    continue
-
-                if gitignore_enabled and pathspec:
-                    rel_file = os.path.relpath(abs_file, self._display_root)
-                    # If pathspec matches => "ignored"
-                    if pathspec.match_file(rel_file):
-                        continue
-                results.append(abs_file)
-                if len(results) > settings.max_files:
-                    logger.warning("Too many files in project")
-                    return []
+            # If pathspec matches => "ignored"
+            if gitignore_enabled and pathspec and \
+                    pathspec.match_file(rel_folder + entry.name):
+                continue
+            files.append(entry.path)
+        return files, subfolders, mtime_ns
 
-        return results
+    def _scan_signature(self, root, ignored_folders):
+        """Returns everything other than the folder contents that affects the
+        folder listings. Stored listings are only reused if the signature is
+        the same.
+        """
+        gitignore = None
+        if self._filter_proxy.gitignore_enabled and self._filter_proxy.pathspec:
+            try:
+                st = os.stat(os.path.join(root, '.gitignore'))
+            except OSError:
+                pass
+            else:
+                gitignore = [st.st_mtime_ns, st.st_size]
+        return [FOLDER_LISTINGS_VERSION, root, gitignore,
+                sorted(ignored_folders)]
+
+    def _load_folder_listings(self, signature):
+        """Returns the listings from the last scan, or from disk if there was
+        no scan yet in this session, as a dict that maps folders to
+        (files, subfolders, mtime_ns) listings.
+        """
+        if self._folder_listings is None:
+            try:
+                with open(self._folder_listings_path, encoding='utf-8') as fd:
+                    stored = json.load(fd)
+            except (OSError, ValueError) as e:
+                logger.info(f"no stored folder listings: {e}")
+                stored = None
+            # The file is stored as a [signature, listings] pair. Anything
+            # else is ignored. The pair is converted to a tuple so that it
+            # compares equal to the listings of an unchanged folder tree, and
+            # the file isn't written again needlessly.
+            if isinstance(stored, list) and len(stored) == 2 and \
+                    isinstance(stored[1], dict):
+                self._folder_listings = tuple(stored)
+            else:
+                if stored is not None:
+                    logger.info("ignoring malformed folder listings")
+                self._folder_listings = None, {}
+        stored_signature, listings = self._folder_listings
+        if stored_signature != signature:
+            return {}
+        return listings
+
+    def _save_folder_listings(self, signature, listings):
+        """Stores the reusable listings in memory and on disk. The file is
+        written to a temporary file first and then moved into place, so that
+        an interrupted write never leaves a corrupt file behind.
+        """
+        listings = {folder: listing for folder, listing in listings.items()
+                    if listing[2] is not None}
+        if self._folder_listings == (signature, listings):
+            return
+        self._folder_listings = signature, listings
+        cache_dir = os.path.dirname(self._folder_listings_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=cache_dir,
+                                             encoding='utf-8',
+                                             delete=False) as fd:
+                json.dump([signature, listings], fd)
+            os.replace(fd.name, self._folder_listings_path)
+        except OSError as e:
+            logger.warning(f"failed to store folder listings: {e}")
 
     @classmethod
     def open_folder(cls, editor_panel, parent=None) -> object | None:
@@ -353,32 +839,46 @@ class ProjectExplorer(QDockWidget):
         """Toggles the .gitignore filter on or off and refreshes the model.
         """
         self._filter_proxy.gitignore_enabled = enabled
+        self._invalidate_file_list()
         self._model.setRootPath(self._display_root)
         self._filter_proxy.set_root_folder(self._display_root)
+        # The contents of the root folder are the top-level items of the
+        # model, so the root folder doesn't need to be expanded
         self._filter_proxy.invalidateFilter()
-        # Make the root folder visible and expanded
-        root_idx = self._model.index(self._display_root)
-        if root_idx.isValid():
-            proxy_root_index = self._filter_proxy.mapFromSource(root_idx)
-            self._tree_view.setRootIndex(proxy_root_index)
-            # Expand the root so it behaves like an expanded folder
-            self._tree_view.expand(proxy_root_index)
 
     def _on_expanded_proxy(self, proxy_index):
-        """Convert the proxy index to the source model index and notify LazyQFileSystemModel.
+        """Convert the proxy index to the source model index and queue the
+        change for LazyDirModel.
         """
-        source_index = self._filter_proxy.mapToSource(proxy_index)
-        if source_index.isValid():
-            path = self._model.filePath(source_index)
-            self._model.notify_path_expanded(path)
+        self._queue_tree_change(proxy_index, True)
 
     def _on_collapsed_proxy(self, proxy_index):
-        """Convert the proxy index to the source model index and notify LazyQFileSystemModel.
+        """Convert the proxy index to the source model index and queue the
+        change for LazyDirModel.
         """
+        self._queue_tree_change(proxy_index, False)
+
+    def _queue_tree_change(self, proxy_index, expanded):
         source_index = self._filter_proxy.mapToSource(proxy_index)
-        if source_index.isValid():
-            path = self._model.filePath(source_index)
-            self._model.notify_path_collapsed(path)
+        if not source_index.isValid():
+            return
+        path = self._model.filePath(source_index)
+        # Only the last change for each path matters, and it is moved to the
+        # end so that changes are applied in the order in which they happened
+        self._pending_tree_changes.pop(path, None)
+        self._pending_tree_changes[path] = expanded
+        if not self._tree_change_timer.isActive():
+            self._tree_change_timer.start()
+
+    def _apply_tree_changes(self):
+        """Notify LazyDirModel of all queued expand and collapse changes."""
+        changes = self._pending_tree_changes
+        self._pending_tree_changes = {}
+        for path, expanded in changes.items():
+            if expanded:
+                self._model.notify_path_expanded(path)
+            else:
+                self._model.notify_path_collapsed(path)
 
     def _set_single_column_view(self, single_column=True):
         """If single_column=True, show only the file name column with no header."""
@@ -397,133 +897,139 @@ class ProjectExplorer(QDockWidget):
         """Open file on double-click if it's not a directory."""
         source_index = self._filter_proxy.mapToSource(proxy_index)
         path = self._model.filePath(source_index)
-        if os.path.isfile(path):
+        # The model already knows whether the path is a folder, so there's no
+        # need to stat it
+        if path and not self._model.isDir(source_index):
             logger.info(f"Double-click opening file: {path}")
             self._editor_panel.open_file(path)
         else:
             logger.info(f"Double-clicked on directory: {path}")
 
+    def _setup_context_menus(self):
+        """Builds the context menus for empty space, files, and folders. The
+        actions act on self._context_path, which is set right before a menu
+        is shown.
+        """
+        self._context_path = None
+        self._context_proxy_index = QModelIndex()
+
+        def action(text, slot, shortcut=None):
+            act = QAction(text, self)
+            if shortcut is not None:
+                act.setShortcut(QKeySequence(shortcut))
+            act.triggered.connect(slot)
+            return act
+
+        # Actions that are shared between the menus
+        new_file_action = action("New File…", self._on_context_new_file,
+                                 QKeySequence.New)
+        new_folder_action = action("New Folder…",
+                                   self._on_context_new_folder,
+                                   "Ctrl+Shift+N")
+        rename_action = action("Rename…", self._on_context_rename, "F2")
+        delete_action = action("Delete", self._on_context_delete,
+                               QKeySequence.Delete)
+        cut_action = action("Cut", self._on_context_cut, QKeySequence.Cut)
+        copy_action = action("Copy", self._on_context_copy, QKeySequence.Copy)
+        self._paste_action = action("Paste", self._on_context_paste,
+                                    QKeySequence.Paste)
+        clipboard_actions = [cut_action, copy_action, self._paste_action]
+
+        # Clicked on empty space
+        self._empty_menu = QMenu(self)
+        self._empty_menu.addActions([
+            action("New File…", self._on_context_new_file),
+            action("New Folder…", self._on_context_new_folder)
+        ])
+        # Right-clicked on a file
+        self._file_menu = QMenu(self)
+        self._file_menu.addActions([
+            action("Open", self._on_context_open_file),
+            action("Open containing folder",
+                   self._on_context_open_containing_folder),
+            rename_action,
+            delete_action
+        ])
+        self._file_menu.addSeparator()
+        self._file_menu.addActions(clipboard_actions)
+        # Right-clicked on a folder
+        self._folder_menu = QMenu(self)
+        self._folder_menu.addActions([
+            action("Open", self._on_context_expand_folder,
+                   QKeySequence.Open),
+            action("Open folder", self._on_context_open_folder),
+            new_file_action,
+            new_folder_action,
+            rename_action,
+            delete_action
+        ])
+        self._folder_menu.addSeparator()
+        self._folder_menu.addActions(clipboard_actions)
+
     def _show_context_menu(self, pos):
-        """Build and show a context menu on right-click."""
+        """Show the appropriate context menu on right-click."""
         proxy_index = self._tree_view.indexAt(pos)
         source_index = self._filter_proxy.mapToSource(proxy_index)
+        if not source_index.isValid():
+            menu = self._empty_menu
+            self._context_path = self._model.rootPath()
+        else:
+            self._context_path = self._model.filePath(source_index)
+            if self._model.isDir(source_index):
+                menu = self._folder_menu
+            else:
+                menu = self._file_menu
+        self._context_proxy_index = proxy_index
+        self._paste_action.setEnabled(self._clipboard_source_path is not None)
+        menu.exec_(self._tree_view.mapToGlobal(pos))
 
-        menu = QMenu(self)
+    def _on_context_open_file(self):
+        self._editor_panel.open_file(self._context_path)
 
-        if not source_index.isValid():
-            # Clicked on empty space
-            new_file_action = menu.addAction("New File…")
-            new_folder_action = menu.addAction("New Folder…")
-            chosen_action = menu.exec_(self._tree_view.mapToGlobal(pos))
-
-            if chosen_action == new_file_action:
-                root_path = self._model.rootPath()
-                if os.path.isdir(root_path):
-                    self._create_new_file(root_path)
-            elif chosen_action == new_folder_action:
-                root_path = self._model.rootPath()
-                if os.path.isdir(root_path):
-                    self._create_new_folder(root_path)
+    def _on_context_expand_folder(self):
+        # Expand in the tree if not already expanded
+        proxy_index = self._context_proxy_index
+        if proxy_index.isValid() and not self._tree_view.isExpanded(proxy_index):
+            self._tree_view.expand(proxy_index)
 
-        else:
-            path = self._model.filePath(source_index)
-            is_file = os.path.isfile(path)
-
-            if is_file:
-                # Right-clicked on a file
-                open_action = menu.addAction("Open")
-                open_sys_action = menu.addAction("Open containing folder")
-                rename_action = menu.addAction("Rename…")
-                rename_action.setShortcut(QKeySequence("F2"))
-                delete_action = menu.addAction("Delete")
-                delete_action.setShortcut(QKeySequence.Delete)
-
-                menu.addSeparator()
-                cut_action = menu.addAction("Cut")
-                cut_action.setShortcut(QKeySequence.Cut)
-                copy_action = menu.addAction("Copy")
-                copy_action.setShortcut(QKeySequence.Copy)
-                paste_action = menu.addAction("Paste")
-                paste_action.setShortcut(QKeySequence.Paste)
-                paste_action.setEnabled(self._clipboard_source_path is not None)
-
-                chosen_action = menu.exec_(self._tree_view.mapToGlobal(pos))
-                if chosen_action == open_action:
-                    self._editor_panel.open_file(path)
-                elif chosen_action == open_sys_action:
-                    # Open the file's parent folder
-                    containing_folder = os.path.dirname(path)
-                    try:
-                        QDesktopServices.openUrl(QUrl.fromLocalFile(containing_folder))
-                    except Exception as e:
-                        QMessageBox.warning(self, "Error", f"Failed to open folder:\n{str(e)}")
-                elif chosen_action == rename_action:
-                    self._rename_file_or_folder(path)
-                elif chosen_action == delete_action:
-                    self._delete_file_or_folder(path)
-                elif chosen_action == cut_action:
-                    self._clipboard_operation = 'cut'
-                    self._clipboard_source_path = path
-                elif chosen_action == copy_action:
-                    self._clipboard_operation = 'copy'
-                    self._clipboard_source_path = path
-                elif chosen_action == paste_action:
-                    self._paste_file_or_folder(path)
+    def _on_context_open_containing_folder(self):
+        self._open_in_system_browser(os.path.dirname(self._context_path))
 
-            else:
-                # Right-clicked on a folder
-                open_action = menu.addAction("Open")
-                open_action.setShortcut(QKeySequence.Open)
-                open_sys_action = menu.addAction("Open folder")
-                new_file_action = menu.addAction("New File…")
-                new_file_action.setShortcut(QKeySequence.New)
-                new_folder_action = menu.addAction("New Folder…")
-                new_folder_action.setShortcut(QKeySequence("Ctrl+Shift+N"))
-                rename_action = menu.addAction("Rename…")
-                rename_action.setShortcut(QKeySequence("F2"))
-                delete_action = menu.addAction("Delete")
-                delete_action.setShortcut(QKeySequence.Delete)
-
-                menu.addSeparator()
-                cut_action = menu.addAction("Cut")
-                cut_action.setShortcut(QKeySequence.Cut)
-                copy_action = menu.addAction("Copy")
-                copy_action.setShortcut(QKeySequence.Copy)
-                paste_action = menu.addAction("Paste")
-                paste_action.setShortcut(QKeySequence.Paste)
-                paste_action.setEnabled(self._clipboard_source_path is not None)
-
-                chosen_action = menu.exec_(self._tree_view.mapToGlobal(pos))
-                if chosen_action == open_action:
-                    # Expand in the tree if not already expanded
-                    if proxy_index.isValid() and not self._tree_view.isExpanded(proxy_index):
-                        self._tree_view.expand(proxy_index)
-                elif chosen_action == open_sys_action:
-                    # Open the folder in system browser
-                    try:
-                        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
-                    except Exception as e:
-                        QMessageBox.warning(self, "Error", f"Failed to open folder:\n{str(e)}")
-                elif chosen_action == new_file_action:
-                    self._create_new_file(path)
-                elif chosen_action == new_folder_action:
-                    self._create_new_folder(path)
-                elif chosen_action == rename_action:
-                    self._rename_file_or_folder(path)
-                elif chosen_action == delete_action:
-                    self._delete_file_or_folder(path)
-                elif chosen_action == cut_action:
-                    self._clipboard_operation = 'cut'
-                    self._clipboard_source_path = path
-                elif chosen_action == copy_action:
-                    self._clipboard_operation = 'copy'
-                    self._clipboard_source_path = path
-                elif chosen_action == paste_action:
-                    self._paste_file_or_folder(path)
+    def _on_context_open_folder(self):
+        self._open_in_system_browser(self._context_path)
+
+    def _open_in_system_browser(self, folder):
+        try:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(folder))
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to open folder:\n{str(e)}")
+
+    def _on_context_new_file(self):
+        self._create_new_file(self._context_path)
+
+    def _on_context_new_folder(self):
+        self._create_new_folder(self._context_path)
+
+    def _on_context_rename(self):
+        self._rename_file_or_folder(self._context_path)
+
+    def _on_context_delete(self):
+        self._delete_file_or_folder(self._context_path)
+
+    def _on_context_cut(self):
+        self._clipboard_operation = 'cut'
+        self._clipboard_source_path = self._context_path
+
+    def _on_context_copy(self):
+        self._clipboard_operation = 'copy'
+        self._clipboard_source_path = self._context_path
+
+    def _on_context_paste(self):
+        self._paste_file_or_folder(self._context_path)
 
     def _create_new_file(self, folder):
         """Create a new file in the specified folder."""
-        if not os.path.isdir(folder):
+        if not _is_dir(folder):
             return
 
         file_name, ok = QInputDialog.getText(self, "New File", "File name:")
@@ -540,12 +1046,13 @@ class ProjectExplorer(QDockWidget):
             with open(file_path, 'w', encoding='utf8') as f:
                 f.write("")
             logger.info(f"Created file: {file_path}")
+            self._invalidate_file_list()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to create file:\n{str(e)}")
 
     def _create_new_folder(self, parent_folder):
         """Creates a new subfolder inside 'parent_folder'."""
-        if not os.path.isdir(parent_folder):
+        if not _is_dir(parent_folder):
             return
         folder_name, ok = QInputDialog.getText(self, "New Folder", "Folder name:")
         if not ok or not folder_name:
@@ -555,6 +1062,7 @@ class ProjectExplorer(QDockWidget):
         try:
             os.mkdir(new_path)
             logger.info(f"Created folder: {new_path}")
+            self._invalidate_file_list()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to create folder:\n{str(e)}")
 
@@ -576,53 +1084,82 @@ class ProjectExplorer(QDockWidget):
             
         new_path = os.path.join(parent_dir, new_name)
         
-        # Check if target already exists
-        if os.path.exists(new_path):
+        # Check if target already exists. lexists() also catches broken
+        # symlinks, which os.rename() would silently replace.
+        if os.path.lexists(new_path):
             QMessageBox.warning(self, "Error", f"'{new_name}' already exists.")
             return
             
         try:
             os.rename(path, new_path)
             logger.info(f"Renamed '{old_name}' to '{new_name}'")
+            self._invalidate_file_list()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to rename:\n{str(e)}")
 
     def _delete_file_or_folder(self, path):
-        """Delete a file or entire folder."""
+        """Delete a file or entire folder. This happens in a background
+        thread, so that deleting a large folder doesn't block the user
+        interface.
+        """
+        if send2trash is None:
+            question = f"Delete '{path}'?"
+        else:
+            question = f"Move '{path}' to the trash?"
         reply = QMessageBox.question(
             self, "Delete",
-            f"Delete '{path}'?",
+            question,
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
         if reply == QMessageBox.No:
             return
+        threading.Thread(target=self._delete_in_background, args=(path,),
+                         daemon=True).start()
+
+    def _delete_in_background(self, path):
         try:
-            if os.path.isfile(path):
+            if send2trash is not None:
+                send2trash(path)
+            elif os.path.isfile(path) or os.path.islink(path):
                 os.remove(path)
             else:
                 shutil.rmtree(path)
-            logger.info(f"Deleted: {path}")
         except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to delete:\n{str(e)}")
+            self._deletion_finished.emit(path, str(e))
+        else:
+            self._deletion_finished.emit(path, '')
+
+    def _on_deletion_finished(self, path, error):
+        if error:
+            QMessageBox.warning(self, "Error", f"Failed to delete:\n{error}")
+            return
+        logger.info(f"Deleted: {path}")
+        self._invalidate_file_list()
 
     def _paste_file_or_folder(self, target_path):
         """Paste files/folders from our local 'clipboard_operation' into target_path."""
         if not self._clipboard_operation or not self._clipboard_source_path:
             return
-        if os.path.isfile(target_path):
+        # A single stat tells whether the target is a file or a folder
+        try:
+            target_mode = os.stat(target_path).st_mode
+        except OSError:
+            target_mode = 0
+        if stat.S_ISREG(target_mode):
             target_path = os.path.dirname(target_path)
-        if not os.path.isdir(target_path):
+        elif not stat.S_ISDIR(target_mode):
             QMessageBox.warning(self, "Error", "Target is not a valid folder.")
             return
 
         src = self._clipboard_source_path
         dst = os.path.join(target_path, os.path.basename(src))
+        src_is_dir = _is_dir(src)
 
         # Handle the case where source and destination are the same (copy operation only)
         if self._clipboard_operation == 'copy' and os.path.abspath(src) == os.path.abspath(dst):
             base_name = os.path.basename(src)
-            if os.path.isfile(src) and '.' in base_name:
+            if not src_is_dir and '.' in base_name:
                 # For files with extensions
                 name, ext = os.path.splitext(base_name)
                 dst = os.path.join(target_path, f"{name} (Copy){ext}")
@@ -633,7 +1170,7 @@ class ProjectExplorer(QDockWidget):
             # If that name also exists, add numbers
             counter = 2
             while os.path.exists(dst):
-                if os.path.isfile(src) and '.' in base_name:
+                if not src_is_dir and '.' in base_name:
                     name, ext = os.path.splitext(base_name)
                     dst = os.path.join(target_path, f"{name} (Copy {counter}){ext}")
                 else:
@@ -642,13 +1179,19 @@ class ProjectExplorer(QDockWidget):
 
         try:
             if self._clipboard_operation == 'copy':
-                if os.path.isdir(src):
-                    shutil.copytree(src, dst)
+                copy_function = functools.partial(
+                    _fast_copy,
+                    preserve_metadata=settings.preserve_metadata_on_paste)
+                if src_is_dir:
+                    shutil.copytree(src, dst, copy_function=copy_function)
                 else:
-                    shutil.copy2(src, dst)
+                    copy_function(src, dst)
             elif self._clipboard_operation == 'cut':
+                # shutil.move() renames if possible, which moves even large
+                # folders instantly within the same file system
                 shutil.move(src, dst)
             logger.info(f"{self._clipboard_operation.title()} '{src}' to '{dst}'")
+            self._invalidate_file_list()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to {self._clipboard_operation}:\n{str(e)}")
 
@@ -30,6 +30,14 @@ class AutoPair:
         self._trigger_chars = ''.join([pair['open_seq'] + pair['close_seq']
                                       for pair in self.PAIRS])
 
+    def _char_at(self, pos):
+        """Returns the character at pos, like toPlainText()[pos], but without
+        copying the text of the entire document.
+        """
+        char = self.document().characterAt(pos)
+        # Line breaks are paragraph separators in the document
+        return '\n' if char == '\u2029' else char
+
     def keyPressEvent(self, event):
         # Determine all relevant variables upfront
         typed_char = event.text()
@@ -37,8 +45,9 @@ class AutoPair:
         cursor = self.textCursor()
         old_pos = cursor.position()
         selected_text = cursor.selectedText()
-        doc_text = self.toPlainText()
-        doc_len = len(doc_text)
+        # The document ends with a paragraph separator that is not part of the
+        # text
+        doc_len = self.document().characterCount() - 1
         # If the old cursor position is beyond the length of the document, then
         # we don't need to do anything.
         if old_pos >= doc_len:
@@ -46,14 +55,11 @@ class AutoPair:
             return
         # Get character before cursor
         if old_pos > 0:
-            char_before = doc_text[old_pos - 1]
+            char_before = self._char_at(old_pos - 1)
         else:
             char_before = ""        
         # Get character after cursor
-        if old_pos < doc_len:
-            char_after = doc_text[old_pos]
-        else:
-            char_after = ""
+        char_after = self._char_at(old_pos)
 
         # If there is no opening (trigger character or backspace), then we 
         # don't need to do anything.
@@ -90,9 +96,9 @@ class AutoPair:
                 if typed_char == pair["close_seq"]:
                     new_cursor = self.textCursor()
                     new_pos = new_cursor.position()
-                    new_doc_text = self.toPlainText()
-                    new_doc_len = len(new_doc_text)
-                    if new_pos < new_doc_len and new_doc_text[new_pos] == typed_char:
+                    new_doc_len = self.document().characterCount() - 1
+                    if new_pos < new_doc_len and \
+                            self._char_at(new_pos) == typed_char:
                         # We remove the newly typed character and move cursor forward
                         # Remove the bracket that was just typed
                         new_cursor.setPosition(old_pos)
@@ -106,18 +112,18 @@ class AutoPair:
         #    If it does, insert close_seq + inbetween_seq, then restore cursor.
         new_cursor = self.textCursor()
         new_pos = new_cursor.position()
-        text = self.toPlainText()
 
         # We'll scan backward from new_pos for up to _max_open_len chars
         start_search = max(0, new_pos - self._max_open_len)
-        just_typed = text[start_search:new_pos]
+        just_typed = ''.join(self._char_at(pos)
+                             for pos in range(start_search, new_pos))
 
         for pair in self.PAIRS:
             open_seq = pair["open_seq"]
             close_seq = pair["close_seq"]
             inbetween_seq = pair["inbetween_seq"]
 
-            if just_typed.endswith(open_seq) and event.text() == text[new_pos - 1: new_pos]:
+            if just_typed.endswith(open_seq) and event.text() == just_typed[-1:]:
                 self._insert_pair(open_seq, close_seq, inbetween_seq,
                                   selected_text, new_pos)
                 break
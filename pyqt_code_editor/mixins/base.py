@@ -1,7 +1,9 @@
 from ..worker import manager
-from qtpy.QtCore import QTimer, Signal
+from qtpy.QtCore import QTimer, Signal, QSocketNotifier
 from qtpy.QtGui import QTextCursor
 import logging
+import sys
+from queue import Empty
 logger = logging.getLogger(__name__)
 
 active_editor = None
@@ -26,11 +28,18 @@ class Base:
         super().__init__(*args, **kwargs)
         logger.info("Initializing Base")
         self.installEventFilter(self)
-        # Poll timer to retrieve results from the worker
+        # Poll timer to retrieve results from the worker. Where possible,
+        # results are retrieved as soon as they arrive through a socket
+        # notifier on the result queue, and then the timer is only a fallback
+        # that also notices workers that died. On Windows, the result queue is
+        # not backed by a file descriptor that can be watched.
         self._cm_result_queue = None
         self._cm_worker_pid = None
         self._cm_poll_timer = QTimer(self)
-        self._cm_poll_timer.setInterval(50)  # 10 times/second
+        if sys.platform == 'win32':
+            self._cm_poll_timer.setInterval(50)  # 20 times/second
+        else:
+            self._cm_poll_timer.setInterval(1000)
         self._cm_poll_timer.timeout.connect(self._cm_check_result)
         self._cm_poll_timer.start()
         self.code_editor_line_annotations = {}
@@ -39,6 +48,34 @@ class Base:
         self.modificationChanged.connect(self.set_modified)
         # Dictionary mapping pid -> result queue
         self._active_requests = {}
+        # Dictionary mapping pid -> action of the request that is in progress
+        self._active_actions = {}
+        # Dictionary mapping action -> the most recent request that is waiting
+        # for an earlier request with the same action to finish
+        self._queued_requests = {}
+        # Dictionary mapping pid -> socket notifier on the result queue
+        self._result_notifiers = {}
+        # The text of the document is kept until the document changes, so that
+        # the text is not copied again for each request that needs it
+        self._cm_text_cache = None
+        # Increases whenever the text changes, so that results can be matched
+        # to the text that they were computed for. QTextDocument.revision()
+        # is not used for this, because it also increases when the document
+        # is highlighted again.
+        self._cm_revision = 0
+        self.document().contentsChange.connect(self._cm_on_text_change)
+        
+    def _cm_on_text_change(self, *args):
+        self._cm_text_cache = None
+        self._cm_revision += 1
+
+    def _cm_text(self):
+        """Returns the same as toPlainText(), but only copies the text of the
+        document if it has changed since the last call.
+        """
+        if self._cm_text_cache is None:
+            self._cm_text_cache = self.toPlainText()
+        return self._cm_text_cache
         
     def unload(self):
         """Can be implemented in other mixin classes to handle unloading logic.
@@ -84,12 +121,34 @@ class Base:
         Send a request to the worker manager. 
         This returns a unique queue/pid pair each time, 
         so we can handle multiple concurrent requests.
+        
+        Only one request per action is in progress at a time. If a request
+        with the same action is still in progress, the new request is queued
+        until it has finished, and replaces any request that was already
+        queued. This way, requests that are superseded while typing quickly
+        are never processed. The request in progress is cancelled, so that it
+        finishes sooner.
         """
+        action = data.get('action')
+        if action in self._active_actions.values():
+            logger.info(f"Queueing request {action} until the previous one has finished")
+            if action not in self._queued_requests:
+                for pid, active_action in self._active_actions.items():
+                    if active_action == action:
+                        manager.cancel_request(pid)
+            self._queued_requests[action] = data
+            return
         result_queue, pid = manager.send_worker_request(**data)
         if result_queue is None:
             logger.info('Request ignored')
             return
         self._active_requests[pid] = result_queue
+        self._active_actions[pid] = action
+        if sys.platform != 'win32':
+            notifier = QSocketNotifier(result_queue._reader.fileno(),
+                                       QSocketNotifier.Type.Read, self)
+            notifier.activated.connect(lambda *args: self._cm_check_result())
+            self._result_notifiers[pid] = notifier
         logger.info(f"Sent request to worker {pid}, now tracking {len(self._active_requests)} active requests.")
 
     def handle_worker_result(self, action, result):
@@ -109,18 +168,25 @@ class Base:
         # Create a list of active requests to avoid the dictionary being 
         # changed during iteration
         for pid, queue in list(self._active_requests.items()):
-            # 1) Check if the worker is still alive
-            if not manager.check_worker_alive(pid):
+            # 1) Retrieve the result, if any, with a single non-blocking get
+            try:
+                result = queue.get_nowait()
+            except (EOFError, OSError):
+                # The other end of the queue was closed, which means that the
+                # worker died
                 logger.warning(f"Worker process {pid} no longer alive. Removing from active requests.")
                 to_remove.append(pid)
                 continue
-
-            # 2) If queue is empty, nothing more to do right now
-            if queue.empty():
+            except Empty:
+                # 2) If there is no result yet, check if the worker is still
+                # alive. This is only needed while waiting, which avoids a
+                # process check for each result.
+                if not manager.check_worker_alive(pid):
+                    logger.warning(f"Worker process {pid} no longer alive. Removing from active requests.")
+                    to_remove.append(pid)
                 continue
 
-            # 3) Retrieve the result, mark worker free
-            result = queue.get()
+            # 3) Mark worker free
             manager.mark_worker_as_free(pid)
 
             # 4) Validate result structure
@@ -137,15 +203,30 @@ class Base:
                 continue
 
             logger.info(f"Received worker result from {pid}: action={action}")
-            self.handle_worker_result(action, result)
+            # 6) If a newer request with the same action is waiting, the
+            # result is outdated, and it is ignored in favor of the newer
+            # request, which is sent below
+            if action in self._queued_requests:
+                logger.info(f"Ignoring outdated {action} result from {pid}")
+            else:
+                self.handle_worker_result(action, result)
 
-            # 6) We're done with this particular request
+            # 7) We're done with this particular request
             to_remove.append(pid)
 
         # Cleanup: remove completed or dead requests. Also stop unused workers.
         # This function periodically prunes worker processes if they are unused.
         for pid in to_remove:
             self._active_requests.pop(pid, None)
+            action = self._active_actions.pop(pid, None)
+            notifier = self._result_notifiers.pop(pid, None)
+            if notifier is not None:
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+            # Send the request that was waiting for this one, if any
+            data = self._queued_requests.pop(action, None)
+            if data is not None:
+                self.send_worker_request(**data)
         manager.stop_unused_workers()
         
     def set_modified(self, modified):
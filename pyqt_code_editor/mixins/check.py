@@ -2,6 +2,7 @@ import logging
 from qtpy.QtCore import QTimer
 from qtpy.QtGui import QColor
 from ..environment_manager import environment_manager
+from .. import settings
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +22,7 @@ class Check:
         # Debounce timer: when the user stops typing for N ms, we trigger the lint action
         self._check_debounce_timer = QTimer(self)
         self._check_debounce_timer.setSingleShot(True)
-        self._check_debounce_timer.setInterval(500)
+        self._check_debounce_timer.setInterval(settings.check_debounce_delay)
         self._check_debounce_timer.timeout.connect(self._execute_check)
 
         # Connect textChanged signal to a debounced method
@@ -31,7 +32,7 @@ class Check:
         """
         Called immediately on text changes. Rather than calling
         the worker here, we restart the debounce timer so that
-        checks won't happen until the user is idle for ~500ms.
+        checks won't happen until the user is idle for a moment.
         """
         if self._check_debounce_timer.isActive():
             self._check_debounce_timer.stop()
@@ -41,7 +42,7 @@ class Check:
         """
         Runs the actual lint check after the debounce period.
         """
-        code = self.toPlainText()
+        code = self._cm_text()
         logger.info("Requesting lint check")
         self.send_worker_request(
             action='check',
@@ -58,6 +59,13 @@ class Check:
         super().handle_worker_result(action, result)
         if action != 'check':
             return
+        # If the code has changed since, and a newer check is about to be
+        # requested, the results are outdated and the line numbers may no
+        # longer be right. The newer check will replace them. Results for
+        # which a newer check is already queued don't get here at all.
+        if self._check_debounce_timer.isActive():
+            logger.info("Ignoring outdated check results")
+            return
         # Clear all previous check annotations
         self.code_editor_line_annotations = {
             line_number: annotation for line_number, annotation
@@ -43,39 +43,45 @@ class Complete:
         # Create (but keep hidden) our persistent calltip widget
         self._cm_calltip_widget = CalltipWidget(self)
         self._cm_calltip_widget.hide()
-        self._cm_paren_prefix = None
+        # A (position, balance) tuple, where balance is the net # of '(' minus
+        # ')' from the start of the text up to (but not including) position
+        self._cm_paren_checkpoint = (0, 0)
+        self.document().contentsChange.connect(self._cm_on_contents_change)
         logger.info("Complete initialized.")
 
-    def _update_paren_prefix_cache(self):
+    def _cm_on_contents_change(self, position, chars_removed, chars_added):
         """
-        Build a prefix array self._cm_paren_prefix so that
-        self._cm_paren_prefix[i] = net # of '(' minus ')' from the start of the text up to (but not including) index i.
-        
-        Then, for a cursor position p, if self._cm_paren_prefix[p] > 0, we know there's at least one unmatched '('.
+        The balance up to the position of a change stays the same, so the
+        checkpoint is only discarded if it lies after the change.
+        """
+        if self._cm_paren_checkpoint[0] > position:
+            self._cm_paren_checkpoint = (0, 0)
+
+    def _paren_balance(self, pos):
         """
-        text = self.toPlainText()
-        prefix = [0] * (len(text) + 1)  # prefix[0] = 0, prefix[i] for i>0 is the balance up to i-1
-        balance = 0
-        for i, ch in enumerate(text):
-            if ch == '(':
-                balance += 1
-            elif ch == ')':
-                balance -= 1
-            prefix[i + 1] = balance
-        self._cm_paren_prefix = prefix
+        Returns the net # of '(' minus ')' from the start of the text up to
+        (but not including) pos. Only the text between the checkpoint and pos
+        is counted, with str.count() so that the counting is done in C, and pos
+        then becomes the new checkpoint.
+        """
+        text = self._cm_text()
+        pos = min(pos, len(text))
+        checkpoint, balance = self._cm_paren_checkpoint
+        if pos >= checkpoint:
+            chunk = text[checkpoint:pos]
+            balance += chunk.count('(') - chunk.count(')')
+        else:
+            chunk = text[pos:checkpoint]
+            balance -= chunk.count('(') - chunk.count(')')
+        self._cm_paren_checkpoint = pos, balance
+        return balance
     
     def _cursor_follows_unclosed_paren(self):
         """
-        Use the prefix cache to quickly check if the current cursor
+        Use the paren balance to quickly check if the current cursor
         is inside an unmatched '(' context.
         """
-        
-        pos = self.textCursor().position()
-        if self._cm_paren_prefix is None or pos >= len(self._cm_paren_prefix):
-            self._update_paren_prefix_cache()
-        if pos >= len(self._cm_paren_prefix):
-            return False
-        return self._cm_paren_prefix[pos] > 0
+        return self._paren_balance(self.textCursor().position()) > 0
     
     def _is_navigation_key(self, event):
         """Return True if event is a navigation key (arrow/home/end/page)."""
@@ -167,14 +173,14 @@ class Complete:
     
             # If we moved left and jumped over '(' => hide & re-check
             if is_left and (old_pos - new_pos == 1):
-                text = self.toPlainText()
+                text = self._cm_text()
                 if 0 <= new_pos < len(text) and text[new_pos] in '()':
                     self._cm_hide_and_recheck_calltip_if_unclosed()
                 return
     
             # If we moved right and jumped over ')' => hide & re-check
             if is_right and (new_pos - old_pos == 1):
-                text = self.toPlainText()
+                text = self._cm_text()
                 if 0 <= old_pos < len(text) and text[old_pos] in '()':
                     self._cm_hide_and_recheck_calltip_if_unclosed()
                 return
@@ -189,7 +195,6 @@ class Complete:
         # 5) If user typed ")", hide calltip immediately
         if typed_char == ')':
             super().keyPressEvent(event)
-            self._update_paren_prefix_cache()
             logger.info("User typed ')' => hiding calltip.")
             self._cm_hide_calltip()
             # Possibly also finalize arguments => request normal completion
@@ -205,23 +210,21 @@ class Complete:
                 if cursor.selectedText() == '(':
                     backspace_removing_open_paren = True
     
-        # Let the editor insert or remove the character normally
+        # Let the editor insert or remove the character normally. The paren
+        # checkpoint is updated through the contentsChange signal.
         super().keyPressEvent(event)
     
-        # 7) Update the paren cache after text changed
-        self._update_paren_prefix_cache()
-    
-        # 8) If user typed "(", request a calltip
+        # 7) If user typed "(", request a calltip
         if typed_char == '(':
             logger.info("User typed '(' => requesting calltip.")
             self._cm_request_calltip()
     
-        # 9) If we removed an "(", hide calltip
+        # 8) If we removed an "(", hide calltip
         if backspace_removing_open_paren:
             logger.info("User removed '(' => hiding calltip.")
             self._cm_hide_calltip()
     
-        # 10) Hide/keep the popup based on typed_char
+        # 9) Hide/keep the popup based on typed_char
         if typed_char:
             if typed_char.isalnum() or typed_char in ('_', '.') or event.key() == Qt.Key_Backspace:
                 logger.info(f"User typed identifier-like char {typed_char!r}; keeping popup open (if visible).")
@@ -266,7 +269,7 @@ class Complete:
     def _cm_request_completion(self, multiline=False, full=False):
         """Send a completion request if one is not already in progress."""
         self._ignore_next_completion = False
-        code = self.toPlainText()
+        code = self._cm_text()
         cursor_pos = self.textCursor().position()
         logger.info("Requesting completions at cursor_pos=%d, multiline=%s", cursor_pos, multiline)
 
@@ -274,6 +277,7 @@ class Complete:
         self.send_worker_request(action='complete', code=code,
                                  cursor_pos=cursor_pos, full=full,
                                  multiline=multiline,
+                                 revision=self._cm_revision,
                                  path=self.code_editor_file_path,
                                  language=self.code_editor_language,
                                  env_path=environment_manager.path,
@@ -281,12 +285,13 @@ class Complete:
 
     def _cm_request_calltip(self):
         """Send a calltip request."""
-        code = self.toPlainText()
+        code = self._cm_text()
         cursor_pos = self.textCursor().position()
         self._cm_requested_calltip_cursor_pos = cursor_pos        
         logger.info("Requesting calltip at cursor_pos=%d", cursor_pos)
         self.send_worker_request(action='calltip', code=code,
                                  cursor_pos=cursor_pos,
+                                 revision=self._cm_revision,
                                  path=self.code_editor_file_path,
                                  language=self.code_editor_language,
                                  env_path=environment_manager.path,
@@ -423,13 +428,16 @@ class Complete:
         cursor.endEditBlock()
         self.setTextCursor(cursor)        
 
-    def _cm_complete(self, completions, cursor_pos, multiline, full):
+    def _cm_complete(self, completions, cursor_pos, multiline, full,
+                     revision=None):
         """Handle completion results from the worker."""
         if self._ignore_next_completion:
             logger.info("Ignoring completion results.")
             self._ignore_next_completion = False
             return
-        # Discard if cursor changed since the request
+        # Discard if text or cursor changed since the request
+        if revision is not None and revision != self._cm_revision:
+            return
         if cursor_pos != self.textCursor().position():
             return
 
@@ -462,10 +470,14 @@ class Complete:
             if not full:
                 self._cm_full_completion_timer.start()
 
-    def _cm_calltip(self, signatures, cursor_pos):
+    def _cm_calltip(self, signatures, cursor_pos, revision=None):
         """
         Called when the worker returns calltip signature info.
         """
+        # Discard if text changed since the request
+        if revision is not None and revision != self._cm_revision:
+            logger.info("Discarding calltip because text changed.")
+            return
         # Discard if cursor changed since the request
         if cursor_pos != self.textCursor().position():
             logger.info(
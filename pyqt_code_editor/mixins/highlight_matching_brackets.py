@@ -45,7 +45,7 @@ class HighlightMatchingBrackets:
         self._bracket_request_pending = True
         self.send_worker_request(action='matching_brackets',
                                  language=getattr(self, "code_editor_language", "python"),
-                                 code=self.toPlainText())
+                                 code=self._cm_text())
 
     def _handle_matching_brackets(self, pairs):
         """Pairs is a list of (open_pos, close_pos) positions relative to the
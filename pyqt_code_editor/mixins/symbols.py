@@ -22,7 +22,7 @@ class Symbols:
     
     def request_symbols(self):
         logger.info("Requesting symbols")
-        code = self.toPlainText()
+        code = self._cm_text()
         self.send_worker_request(action='symbols', code=code,
                                  path=self.code_editor_file_path,
                                  language=self.code_editor_language)
@@ -1,8 +1,12 @@
 import importlib
 from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
 import logging
 logger = logging.getLogger(__name__)
 module_cache = {}
+# Lexers don't keep state between calls to get_tokens(), and can therefore be
+# shared between highlighters for the same language.
+lexer_cache = {}
 
 # Some lexers have weird names that are not recognized by get_lexer_by_name().
 # Often this seems to be a matter of discarding a suffix after a space or /
@@ -14,10 +18,15 @@ def create_syntax_highlighter(language, *args, **kwargs):
         if ch in language:
             logger.info(f'mapping {language} to {language[:language.find(ch)]}')
             language = language[:language.find(ch)]
-    try:        
-        lexer = get_lexer_by_name(language)
-    except Exception:
-        lexer = get_lexer_by_name('markdown')
+    if language not in lexer_cache:
+        try:        
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            logger.info(f'no lexer found for {language}, falling back to markdown')
+            lexer = get_lexer_by_name('markdown')
+        lexer_cache[language] = lexer
+    else:
+        lexer = lexer_cache[language]
     if language not in module_cache:
         try:
             module = importlib.import_module(
@@ -1,35 +1,61 @@
-THEMES = {
-    'light': {
-        'background_color': '#FFFFFF',
-        'text_color': '#000000',
-        'selection_background': '#ADD6FF',
-        'selection_color': '#000000',
-    },
-    'dark': {
-        'background_color': '#1E1E1E',
-        'text_color': '#D4D4D4',
-        'selection_background': '#264F78',
-        'selection_color': '#FFFFFF',
-    },
-    'monokai': {
-        'background_color': '#272822',
-        'text_color': '#F8F8F2',
-        'selection_background': '#49483E',
-        'selection_color': '#F8F8F2',
-    },
-    'solarized_light': {
-        'background_color': '#FDF6E3',
-        'text_color': '#657B83',
-        'selection_background': '#EEE8D5',
-        'selection_color': '#586E75',
-    },
-    'solarized_dark': {
-        'background_color': '#002B36',
-        'text_color': '#839496',
-        'selection_background': '#073642',
-        'selection_color': '#93A1A1',
-    }
-}
+from collections import namedtuple
+from types import MappingProxyType
+
+
+class Theme(namedtuple('Theme', ['background_color', 'text_color',
+                                 'selection_background', 'selection_color'])):
+    """Themes are immutable, which also makes them usable as cache keys. The
+    colors can be read as attributes, or by name like the dicts that themes
+    used to be, so that theme['text_color'] keeps working.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+
+THEMES = MappingProxyType({
+    'light': Theme(
+        background_color='#FFFFFF',
+        text_color='#000000',
+        selection_background='#ADD6FF',
+        selection_color='#000000'
+    ),
+    'dark': Theme(
+        background_color='#1E1E1E',
+        text_color='#D4D4D4',
+        selection_background='#264F78',
+        selection_color='#FFFFFF'
+    ),
+    'monokai': Theme(
+        background_color='#272822',
+        text_color='#F8F8F2',
+        selection_background='#49483E',
+        selection_color='#F8F8F2'
+    ),
+    'solarized_light': Theme(
+        background_color='#FDF6E3',
+        text_color='#657B83',
+        selection_background='#EEE8D5',
+        selection_color='#586E75'
+    ),
+    'solarized_dark': Theme(
+        background_color='#002B36',
+        text_color='#839496',
+        selection_background='#073642',
+        selection_color='#93A1A1'
+    )
+})
 
 OUTER_CONTENT_MARGINS = [12, 12, 12, 12]
 HORIZONTAL_SPACING = 6
@@ -1,6 +1,9 @@
 import os
 from pygments.lexers import guess_lexer_for_filename
 from pygments.util import ClassNotFound
+# Strings are compared in blocks of this many characters when looking for the
+# part that differs, so that most of the comparing is done in C
+CODE_DIFF_BLOCK_SIZE = 4096
 
 
 def guess_language_from_path(filepath):
@@ -106,3 +109,31 @@ def get_first_available_font(font_candidates):
         if candidate in available_families:
             return candidate
     return None
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Returns the length of the longest common prefix of a and b."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + CODE_DIFF_BLOCK_SIZE] == \
+            b[i:i + CODE_DIFF_BLOCK_SIZE]:
+        i += CODE_DIFF_BLOCK_SIZE
+    i = min(i, n)
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix_length(a: str, b: str, max_length: int) -> int:
+    """Returns the length of the longest common suffix of a and b, up to
+    max_length characters.
+    """
+    la, lb = len(a), len(b)
+    j = 0
+    while j + CODE_DIFF_BLOCK_SIZE <= max_length and \
+            a[la - j - CODE_DIFF_BLOCK_SIZE:la - j] == \
+            b[lb - j - CODE_DIFF_BLOCK_SIZE:lb - j]:
+        j += CODE_DIFF_BLOCK_SIZE
+    while j < max_length and a[la - j - 1] == b[lb - j - 1]:
+        j += 1
+    return j
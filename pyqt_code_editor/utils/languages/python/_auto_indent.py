@@ -1,14 +1,31 @@
 from .... import settings
+from ... import common_prefix_length
 from ._mask_str_in_code import mask_str_in_code
+import re
+import bisect
+import functools
 import logging
 logger = logging.getLogger(__name__)
 
-BLOCK_KEYWORDS = (
+BLOCK_KEYWORDS = frozenset((
     "def", "class", "if", "elif", "else", "while", 
     "for", "with", "try", "except", "finally"
-)
+))
 OPEN_TO_CLOSE = {'(': ')', '[': ']', '{': '}'}
+OPENING_BRACKETS = frozenset('([{')
+CLOSING_BRACKETS = frozenset(')]}')
 CLOSE_TO_OPEN = {')': '(', ']': '[', '}': '{'}    
+QUOTE_CHARS = '"\''
+DEDENT_KEYWORDS = ('return', 'break', 'continue')
+# Lines ending with these characters always need the full auto-indent logic
+BLOCK_OR_BRACKET_ENDINGS = OPENING_BRACKETS | CLOSING_BRACKETS | {':'}
+# The number of characters at the end of the code that are checked for opening
+# brackets before taking the fast path in python_auto_indent()
+FAST_PATH_TAIL_SIZE = 4096
+# Matches the tokens that are relevant for parsing brackets: comments, strings
+# (which may be unterminated and span multiple lines), brackets, and newlines.
+BRACKET_TOKEN_PATTERN = re.compile(
+    r'#[^\n]*|"(?:\\[\s\S]|[^"\\])*"?|\'(?:\\[\s\S]|[^\'\\])*\'?|[()\[\]{}\n]')
 
 
 def get_leading_spaces(line: str) -> int:
@@ -16,111 +33,161 @@ def get_leading_spaces(line: str) -> int:
     Return the number of leading spaces in line.
     """
     return len(line) - len(line.lstrip(' '))
-
     
 def _is_block_opener(line: str) -> bool:
     stripped = line.lstrip()
-    lower_stripped = stripped.lower()
-    for kw in BLOCK_KEYWORDS:
-        if lower_stripped.startswith(kw) and (
-            len(stripped) == len(kw)
-            or stripped[len(kw)] in (' ', '(', ':')
-        ):
-            return True
-    return False
+    # Extract the first word, which should be a keyword, and check that it is
+    # followed by a character that can follow a block keyword. Python keywords
+    # are case sensitive, so there is no need to lowercase the line.
+    end = 0
+    n = len(stripped)
+    while end < n and stripped[end].isalpha():
+        end += 1
+    return stripped[:end] in BLOCK_KEYWORDS and (
+        end == n or stripped[end] in ' (:')
 
 
-def parse_brackets(code: str) -> tuple[list[tuple[str, int, int]], dict]:
+def parse_brackets(code: str, lines: list | None = None) -> tuple[list[tuple[str, int, int]], tuple | None]:
     """
-    Parse all lines of code, ignoring quoted strings in a simple way,
-    and return:
+    Parse all lines of code, ignoring quoted strings and comments in a simple
+    way, and return:
         bracket_stack: A list of unclosed brackets in order of appearance,
                        each as (bracket_char, line_index, col_index).
-        bracket_closings: A dict mapping close_line_idx -> (open_line_idx, open_line_indent, open_bracket).
+        last_closing: The last closing bracket as (close_line_idx, open_line_idx, open_line_indent, open_bracket),
+                      or None if no bracket was closed.
+    
+    If the code has already been split into lines, these can be passed so that
+    the code doesn't need to be split again.
     """
-
-    lines = code.split("\n")
+    if lines is None:
+        lines = code.split("\n")
     bracket_stack = []
-    bracket_closings = {}
-    
-    for i, line in enumerate(lines):        
-        j = 0
-        while j < len(line):
-            ch = line[j]
-            if ch in OPEN_TO_CLOSE:
-                bracket_stack.append((ch, i, j))
-            elif ch in CLOSE_TO_OPEN:
-                # If there's something on the stack and it matches, pop it
-                if bracket_stack and bracket_stack[-1][0] == CLOSE_TO_OPEN[ch]:
-                    open_bracket_char, open_line_idx, open_col_idx = bracket_stack.pop()
-                    # record the closing bracket
-                    bracket_closings[i] = (open_line_idx, get_leading_spaces(lines[open_line_idx]), open_bracket_char)
-            j += 1
-    
-    return bracket_stack, bracket_closings
-    
-    
-def _get_unclosed_open_idx(code : str, open_char : str,
-                           close_char : str) -> int | None:
-    """Returns the index of the last unclosed unopening character, such as an
-    opening parenthesis, or None if no unclosed opening character was found.
-    """
-    # We only consider code from the end of the last code comment. This is a
-    # cheap way to avoid the auto indenter from being confused by parentheses
-    # in comments.
-    last_comment = code.rfind('#')
-    if last_comment >= 0:
-        last_comment_end = code[last_comment:].find('\n')
-        if last_comment_end >= 0:
-            last_comment += last_comment_end
-    search_start = max(0, last_comment)
-    if search_start:
-        code = code[search_start:]
-    n_open_required = 1    
-    while n_open_required:
-        close_idx = code.rfind(close_char)
-        open_idx = code.rfind(open_char)
-        if close_idx < 0 and open_idx < 0:
-            break
-        if open_idx > close_idx:
-            n_open_required -= 1
-            code = code[:open_idx]
-        else:
-            n_open_required += 1
-            code = code[:close_idx]
-    if open_idx < 0:
-        return 0
-    return open_idx + search_start
+    last_closing = _scan_brackets(code, lines, 0, 0, bracket_stack)
+    return bracket_stack, last_closing
 
 
-def _line_col_from_idx(full_text, char_index):
-    """
-    Return the 0-based (line, column) pair in `full_text` for the given `char_index`.
-    If char_index is out of range, this function raises an IndexError.
+def _scan_brackets(code: str, lines: list, pos: int, line_idx: int,
+                   bracket_stack: list, last_closing: tuple | None = None,
+                   snapshots: list | None = None,
+                   snapshot_interval: int = 0) -> tuple | None:
+    """Scans code for brackets starting at pos, which should be the start of
+    line line_idx, updates bracket_stack in place, and returns the last closing
+    bracket (see parse_brackets()). last_closing is the last closing bracket
+    before pos. If snapshots is a list, a (pos, line_idx, bracket_stack,
+    last_closing) snapshot is appended to it at the start of a line whenever at
+    least snapshot_interval characters have been scanned since the previous
+    snapshot.
     """
-    if not (0 <= char_index < len(full_text)):
-        raise IndexError("char_index out of range.")
+    # The regular expression engine skips over all characters that are not
+    # relevant, so that only brackets, newlines, strings, and comments are
+    # handled in Python. Frequently used names are bound to locals to avoid
+    # attribute lookups in the loop.
+    is_open = OPENING_BRACKETS.__contains__
+    close_to_open = CLOSE_TO_OPEN.get
+    quote_chars = QUOTE_CHARS
+    stack_append = bracket_stack.append
+    stack_pop = bracket_stack.pop
+    take_snapshots = snapshots is not None
+    line_start = pos
+    next_snapshot = pos + snapshot_interval
+    # Only the last closing bracket is needed, so we keep track of it with
+    # plain variables rather than creating a tuple for each closing bracket.
+    if last_closing is None:
+        close_line_idx = -1
+        open_line_idx = open_char = None
+    else:
+        close_line_idx, open_line_idx, _, open_char = last_closing
+    for match in BRACKET_TOKEN_PATTERN.finditer(code, pos):
+        token = match.group()
+        if token == '\n':
+            line_idx += 1
+            line_start = match.end()
+            if take_snapshots and line_start >= next_snapshot:
+                if close_line_idx >= 0:
+                    last_closing = (close_line_idx, open_line_idx,
+                                    get_leading_spaces(lines[open_line_idx]),
+                                    open_char)
+                snapshots.append((line_start, line_idx, bracket_stack[:],
+                                  last_closing))
+                next_snapshot = line_start + snapshot_interval
+        elif is_open(token):
+            # The stack only holds unclosed brackets, which are few, and
+            # appending a single tuple is much faster than appending to three
+            # parallel arrays.
+            stack_append((token, line_idx, match.start() - line_start))
+        elif token[0] in quote_chars:
+            # Strings may span multiple lines
+            n_newlines = token.count('\n')
+            if n_newlines:
+                line_idx += n_newlines
+                line_start = match.start() + token.rfind('\n') + 1
+        elif token[0] != '#':
+            # If there's something on the stack and it matches, pop it
+            if bracket_stack and bracket_stack[-1][0] == close_to_open(token):
+                # record the closing bracket
+                open_char, open_line_idx, _ = stack_pop()
+                close_line_idx = line_idx
+    if close_line_idx < 0:
+        return None
+    return (close_line_idx, open_line_idx,
+            get_leading_spaces(lines[open_line_idx]), open_char)
 
-    line = 0
-    column = 0
-    idx = 0
 
-    for ch in full_text:
-        if idx == char_index:
-            return (line, column)
-        if ch == '\n':
-            line += 1
-            column = 0
+class IncrementalBracketParser:
+    """Parses brackets like parse_brackets(), but remembers the bracket state
+    at regular intervals in the code. When the code is parsed again after an
+    edit, parsing resumes from the last remembered state before the edit, so
+    that only the code after this point is scanned again.
+    """
+    
+    snapshot_interval = 4096
+    
+    def __init__(self):
+        self._code = ''
+        self._snapshots = []
+        
+    def parse_brackets(self, code: str, lines: list | None = None) -> tuple[list[tuple[str, int, int]], tuple | None]:
+        """See parse_brackets()."""
+        if lines is None:
+            lines = code.split("\n")
+        # Keep only snapshots for which the preceding code hasn't changed,
+        # which are the snapshots up to the end of the common prefix of the
+        # previous and the current code. The snapshots are ordered by
+        # position, so we can use a binary search.
+        prefix_length = common_prefix_length(code, self._code)
+        del self._snapshots[bisect.bisect_right(
+            self._snapshots, prefix_length,
+            key=lambda snapshot: snapshot[0]):]
+        if self._snapshots:
+            pos, line_idx, bracket_stack, last_closing = self._snapshots[-1]
+            bracket_stack = bracket_stack[:]
+            logger.debug('resuming bracket parsing at line %d', line_idx)
         else:
-            column += 1
-        idx += 1
+            pos, line_idx, bracket_stack, last_closing = 0, 0, [], None
+        last_closing = _scan_brackets(
+            code, lines, pos, line_idx, bracket_stack, last_closing,
+            self._snapshots, self.snapshot_interval)
+        self._code = code
+        return bracket_stack, last_closing
 
-    # If char_index matches len(full_text)-1, return the final position:
-    return (line, column)    
+
+incremental_bracket_parser = IncrementalBracketParser()
+    
     
+def _get_preceding_char(lines: list, line_idx: int, col_idx: int) -> str:
+    """Returns the first non-whitespace character that precedes the given
+    position, or an empty string if there is none.
+    """
+    preceding_text = lines[line_idx][:col_idx].rstrip()
+    while not preceding_text and line_idx > 0:
+        line_idx -= 1
+        preceding_text = lines[line_idx].rstrip()
+    return preceding_text[-1:]
+
 
-def _indent_inside_unclosed_call_def_or_class(code: str, lines: list,
-                                              char_idx : int) -> int:
+def _indent_inside_unclosed_call_def_or_class(lines: list, line_idx: int,
+                                              col_idx: int,
+                                              tab_width: int) -> int:
     """
     Return after opening parenthesis as part of function call should trigger indent
     
@@ -240,29 +307,22 @@ def _indent_inside_unclosed_call_def_or_class(code: str, lines: list,
     """
     if not lines:
         return 0    
-    line_idx, col_idx = _line_col_from_idx(code, char_idx)
     # Get the line where the last unclosed parenthesis is
     open_line = lines[line_idx]
     # Collect text after '(' in that line
-    text_after_paren = open_line[col_idx + 1:].rstrip()
+    text_after_paren = open_line[col_idx + 1:]
+    stripped_text_after_paren = text_after_paren.lstrip()
     # If there's no text after '(' on the same line, just indent by tab
-    if not text_after_paren:
+    if not stripped_text_after_paren:
         # Get indentation of open_line
         open_line_indent = len(open_line) - len(open_line.lstrip())
-        return open_line_indent + settings.tab_width
-    # Otherwise, align with the first non-whitespace character after '('
-    prefix = open_line[: col_idx + 1]
-    after_paren_offset = 0
-    for char in open_line[col_idx + 1:]:
-        if char.isspace():
-            after_paren_offset += 1
-        else:
-            break
+        return open_line_indent + tab_width
+    # Otherwise, align with the first non-whitespace character after '('. The
+    # position of the '(' is known from the bracket stack.
+    return col_idx + 1 + len(text_after_paren) - len(stripped_text_after_paren)
 
-    return len(prefix) + after_paren_offset
 
-
-def _indent_after_block_opener(code: str, lines: list) -> int:
+def _indent_after_block_opener(lines: list, tab_width: int) -> int:
     """
     Return after function definition should trigger indent
     
@@ -300,6 +360,15 @@ def _indent_after_block_opener(code: str, lines: list) -> int:
                object2):>
         |
     ```
+    
+    Return after colon after a multi-line condition should indent relative to the block opener, regardless of the indentation of the continuation lines
+    
+    ```
+    if (a or
+        b) and (c or
+                d):>
+        |
+    ```
                                                                        
     Return after function definition should also work with irrelevant parentheses
     
@@ -421,23 +490,36 @@ def _indent_after_block_opener(code: str, lines: list) -> int:
         return 0
     
     last_line = lines[-1]
+    last_line_indent = get_leading_spaces(last_line)
     trimmed_line = last_line.rstrip()
     if not trimmed_line.endswith(':'):
         # just return current line's indentation
-        return get_leading_spaces(last_line)
+        return last_line_indent
     
-    # If it DOES end with a colon, we see if we can locate the block opener line
-    block_opener_idx = len(lines) - 1
+    # If it DOES end with a colon, we see if we can locate the block opener
+    # line. The block opener cannot be indented more deeply than the lines
+    # that follow it, so lines that are indented more deeply than the least
+    # indented line so far are skipped. Lines that are indented less deeply
+    # but are not block openers, such as the continuation lines of a
+    # multi-line condition, lower this minimum indentation. The indentation of
+    # each line is determined only once, and remembered for the block opener.
+    block_opener_indent = min_indent = last_line_indent
+    is_block_opener = _is_block_opener
     for i in range(len(lines) - 1, -1, -1):
-        if _is_block_opener(lines[i]):
-            block_opener_idx = i
+        line = lines[i]
+        indent = get_leading_spaces(line)
+        if indent > min_indent or not line.strip():
+            continue
+        if is_block_opener(line):
+            block_opener_indent = indent
             break
-    
-    block_opener_indent = get_leading_spaces(lines[block_opener_idx])
-    return block_opener_indent + settings.tab_width
+        min_indent = indent
+    return block_opener_indent + tab_width
     
     
-def _indent_inside_uncloded_list_tuple_set_or_dict(code: str, char_idx: int) -> int:
+def _indent_inside_uncloded_list_tuple_set_or_dict(lines: list,
+                                                   bracket_line_idx: int,
+                                                   bracket_col_idx: int) -> int:
     """
     Return after opening of list should trigger matching indent to first element
     
@@ -559,10 +641,8 @@ def _indent_inside_uncloded_list_tuple_set_or_dict(code: str, char_idx: int) ->
             |
     ```        
     """
-    lines = code.split('\n')
     if not lines:
         return 0
-    bracket_line_idx, bracket_col_idx = _line_col_from_idx(code, char_idx)
     # Get the line where the last unclosed parenthesis is
     bracket_line = lines[bracket_line_idx]            
 
@@ -597,7 +677,8 @@ def _indent_inside_uncloded_list_tuple_set_or_dict(code: str, char_idx: int) ->
             return bracket_col_idx + 1
 
 
-def _indent_after_list_tuple_set_or_dict(code: str, bracket_stack, bracket_closings) -> int:
+def _indent_after_list_tuple_set_or_dict(lines: list,
+                                         last_closing: tuple | None) -> int:
     """
     Return after closing of a single-line list should not change indentation.
     
@@ -667,17 +748,16 @@ def _indent_after_list_tuple_set_or_dict(code: str, bracket_stack, bracket_closi
     |
     ```
     """
-    lines = code.split('\n')
     if not lines:
         return 0
     
     last_line_idx = len(lines) - 1
     last_line = lines[last_line_idx]
     last_line_indent = get_leading_spaces(last_line)
-    if last_line and last_line.rstrip()[-1] in (')', ']', '}'):
+    if last_line.rstrip()[-1:] in CLOSING_BRACKETS:
         # We closed a bracket
-        if last_line_idx in bracket_closings:
-            open_line_idx, open_line_indent, open_bracket = bracket_closings[last_line_idx]
+        if last_closing is not None and last_closing[0] == last_line_idx:
+            _, open_line_idx, open_line_indent, open_bracket = last_closing
             if open_line_idx == last_line_idx:
                 # single-line bracket => no change
                 return last_line_indent
@@ -735,67 +815,94 @@ def python_auto_indent(code: str) -> int:
     |
     ```
     """
+    return _python_auto_indent(code, settings.tab_width)
+
+
+@functools.lru_cache(maxsize=8)
+def _python_auto_indent(code: str, tab_width: int) -> int:
+    """Implements python_auto_indent(). The results are cached, because the
+    indentation is often requested repeatedly for the same code. The tab width
+    is passed explicitly so that it is part of the cache key, and so that the
+    helper functions don't need to look it up in the settings.
+    """
+    # Fast path: most of the time, the current line's indentation is simply
+    # preserved. This is the case when the current line doesn't open a block,
+    # doesn't open or close a bracket, and isn't a keyword that affects the
+    # indentation. We then also need to be sure that the code isn't inside an
+    # unclosed bracket, which we assume when there are no opening brackets
+    # near the end of the code. In that case, we don't need to mask strings or
+    # parse brackets at all.
+    current_line = code[code.rfind('\n') + 1:]
+    current_line_strip = current_line.strip()
+    tail = code[-FAST_PATH_TAIL_SIZE:]
+    if current_line_strip[-1:] not in BLOCK_OR_BRACKET_ENDINGS \
+            and current_line_strip not in DEDENT_KEYWORDS \
+            and not current_line_strip.startswith(('def', 'class')) \
+            and '(' not in tail and '[' not in tail and '{' not in tail:
+        logging.info('indent fallback to current line (fast path)')
+        return get_leading_spaces(current_line)
     code = mask_str_in_code(code)
-    lines = code.splitlines()
-    # If code ends with a newline => cursor is on a fresh line
-    if code.endswith('\n'):
-        lines.append('')
-    if not lines:
-        return 0
-    last_line = lines[-1].rstrip()
+    # The current line is split off without splitting the entire code into
+    # lines, because this is only needed when we need to look at the context.
+    current_line_full = code.rpartition('\n')[2]
+    last_line = current_line_full.rstrip()
+    # When needed, the code is split into lines only once, and the lines are
+    # then passed on to the helper functions. If code ends with a newline, the
+    # last line is empty, which means that the cursor is on a fresh line.
+    lines = None
 
     # 1. ends with colon => block opener
     if last_line.endswith(":"):
         logging.info('indent after block opener')
-        return _indent_after_block_opener(code, lines)
+        lines = code.split('\n')
+        return _indent_after_block_opener(lines, tab_width)
             
-    # 2. unmatched '(' => function call/def or tuple
-    last_paren_idx_tuple = _get_unclosed_open_idx(code, '(', ')')
-    if last_paren_idx_tuple:
-        preceding_idx = last_paren_idx_tuple - 1
-        while preceding_idx >= 0 and code[preceding_idx].isspace():
-            preceding_idx -= 1
-        if preceding_idx >= 0:
-            preceding_char = code[preceding_idx]
+    # All unclosed brackets are on the stack, with the innermost one last. If
+    # there are no brackets at all, there's no need to parse them.
+    if '(' in code or '[' in code or '{' in code:
+        lines = code.split('\n')
+        bracket_stack, last_closing = \
+            incremental_bracket_parser.parse_brackets(code, lines)
+    else:
+        bracket_stack, last_closing = [], None
+    if bracket_stack:
+        bracket_char, line_idx, col_idx = bracket_stack[-1]
+        # 2. unmatched '(' => function call/def or tuple
+        if bracket_char == '(':
+            preceding_char = _get_preceding_char(lines, line_idx, col_idx)
             # If preceding char is alnum or _, treat as function call/def
             if preceding_char.isalnum() or preceding_char == "_":
                 logging.info("indent as unclosed call/def")
                 return _indent_inside_unclosed_call_def_or_class(
-                    code, lines, last_paren_idx_tuple)
-            else:
-                logging.info("indent as unclosed tuple")
-                return _indent_inside_uncloded_list_tuple_set_or_dict(
-                    code, last_paren_idx_tuple)
-
-    # 3. unmatched '[' or '{'
-    last_paren_idx_list = _get_unclosed_open_idx(code, '[', ']')
-    last_paren_idx_dict = _get_unclosed_open_idx(code, '{', '}')
-    char_idx = max(last_paren_idx_list, last_paren_idx_dict)
-    if char_idx:
-        logging.info("indent as unclosed list, dict, or set")
-        return _indent_inside_uncloded_list_tuple_set_or_dict(code, char_idx)
+                    lines, line_idx, col_idx, tab_width)
+            logging.info("indent as unclosed tuple")
+        # 3. unmatched '[' or '{'
+        else:
+            logging.info("indent as unclosed list, dict, or set")
+        return _indent_inside_uncloded_list_tuple_set_or_dict(
+            lines, line_idx, col_idx)
 
     # 4. just closed a bracket => after bracket
-    bracket_stack, bracket_closings = parse_brackets(code)
-    if last_line.endswith(("]", "}", ")")):
+    if last_line[-1:] in CLOSING_BRACKETS:
         logging.info('indent as after iterable')
-        return _indent_after_list_tuple_set_or_dict(
-            code, bracket_stack, bracket_closings)
+        if lines is None:
+            # No brackets were opened, so none can have been closed either
+            return get_leading_spaces(current_line_full)
+        return _indent_after_list_tuple_set_or_dict(lines, last_closing)
 
     # 5. Check if the current line is a dedent keyword
-    current_line_full = lines[-1]
     current_line_strip = current_line_full.strip()
-    leading_spaces = get_leading_spaces(current_line_full)
-    if current_line_strip  in ('return', 'break', 'continue'):
-        return max(0, leading_spaces - settings.tab_width)
+    current_leading_spaces = get_leading_spaces(current_line_full)
+    if current_line_strip in DEDENT_KEYWORDS:
+        return max(0, current_leading_spaces - tab_width)
         
     # 6. Check if the current line starts with def or class. If so then we need 
     # to indent. This is a fallback mechanism to catch situations in which this
     # was not properly caught by the above logic.    
     if current_line_strip.startswith('def') or current_line_strip .startswith('class'):
         logging.info('fallback indent as def or class')
-        return leading_spaces + settings.tab_width
+        return current_leading_spaces + tab_width
                      
     # 7. fallback => preserve current line indent
     logging.info('indent fallback to current line')
-    return leading_spaces
+    return current_leading_spaces
@@ -2,6 +2,13 @@ import tokenize
 import io
 import re
 
+# This regex matches f-strings with their content. Make sure 'f' is preceded
+# by something that indicates start of a new token. The pattern is compiled
+# once, because the function is called often, also for short snippets.
+FSTRING_PATTERN = re.compile(
+    r'(?:^|[^a-zA-Z0-9_"\'])(f)(""".*?"""|\'\'\'.*?\'\'\'|".*?"|\'.*?\')',
+    flags=re.DOTALL)
+
 
 def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
     """Takes Python code and masks all characters that are part of a string
@@ -39,10 +46,6 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
     '''
     """
     # First handle f-strings separately using regex
-    # This regex matches f-strings with their content
-    # Make sure 'f' is preceded by something that indicates start of a new token
-    fstring_pattern = r'(?:^|[^a-zA-Z0-9_"\'])(f)(""".*?"""|\'\'\'.*?\'\'\'|".*?"|\'.*?\')'
-    
     def mask_fstring(match):
         # Get the character before 'f' (if any)
         full_match = match.group(0)
@@ -67,7 +70,10 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
         return prefix_char + prefix + quote + masked_content + quote
     
     # Apply f-string masking
-    code = re.sub(fstring_pattern, mask_fstring, code, flags=re.DOTALL)
+    code = FSTRING_PATTERN.sub(mask_fstring, code)
+    # The code is split into lines only once, rather than for each string
+    # token, so that the lines between tokens can be looked up
+    code_lines = code.split('\n')
     
     # Now handle regular strings with tokenizer
     code_bytes = code.encode('utf-8')
@@ -90,7 +96,7 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
                     end_line, end_col = last_end
                     
                     if start_line > end_line or (start_line == end_line and start_col > end_col):
-                        lines = code.split('\n')
+                        lines = code_lines
                         if end_line == start_line:
                             masked_parts.append(lines[end_line - 1][end_col:start_col])
                         else:
@@ -136,18 +142,11 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
                 masked_lines = []
                 
                 for line in lines:
-                    # Find leading whitespace
-                    leading_space = ''
-                    for char in line:
-                        if char in (' ', '\t'):
-                            leading_space += char
-                        else:
-                            break
-                    
-                    # Mask the rest of the line
-                    rest_of_line = line[len(leading_space):]
-                    masked_rest = mask_char * len(rest_of_line)
-                    masked_lines.append(leading_space + masked_rest)
+                    # Keep leading whitespace and mask the rest of the line.
+                    # The content itself isn't needed, only its length.
+                    n_leading = len(line) - len(line.lstrip(' \t'))
+                    masked_lines.append(
+                        line[:n_leading] + mask_char * (len(line) - n_leading))
                 
                 masked_content = '\n'.join(masked_lines)
                 
@@ -158,7 +157,7 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
                 end_line, end_col = last_end
                 
                 if start_line > end_line or (start_line == end_line and start_col > end_col):
-                    lines = code.split('\n')
+                    lines = code_lines
                     if end_line == start_line:
                         masked_parts.append(lines[end_line - 1][end_col:start_col])
                     else:
@@ -180,7 +179,7 @@ def mask_str_in_code(code: str, mask_char: str = 'X') -> str:
         pass
     
     # Add any remaining code
-    lines = code.split('\n')
+    lines = code_lines
     end_line, end_col = last_end
     if end_line <= len(lines):
         masked_parts.append(lines[end_line - 1][end_col:])
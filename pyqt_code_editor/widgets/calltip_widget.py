@@ -26,6 +26,11 @@ class CalltipWidget(QFrame):
         self.setLayout(layout)
 
     def setText(self, text):
+        # While typing inside an argument list, the same calltip is shown
+        # again and again. The label is then left as it is, rather than being
+        # laid out and resized again.
+        if text == self._label.text():
+            return
         self._label.setText(text)
         self.adjustSize()
 
@@ -1,5 +1,5 @@
 from qtpy.QtCore import Qt
-from qtpy.QtWidgets import QListWidget, QListWidgetItem
+from qtpy.QtWidgets import QListWidget
 from .. import settings
 
 
@@ -13,6 +13,7 @@ class CompletionPopup(QListWidget):
         super().__init__(editor)
         self.editor = editor
         self._completion_map = {}
+        self._names = []
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)        
         if editor.code_editor_colors is not None:
@@ -47,10 +48,20 @@ class CompletionPopup(QListWidget):
         Show/update the list of completions near the editor's cursor,
         without grabbing focus or hiding automatically.
         """
-        self.clear()
-        for c in completions:
-            self._completion_map[c['name']] = c['name']
-            QListWidgetItem(c['name'], self)
+        names = [c['name'] for c in completions]
+        # While typing, the same completions often come in again, in which
+        # case the items are kept and only the popup is moved
+        if names != self._names:
+            self._names = names
+            self._completion_map = dict(zip(names, names))
+            # The items are replaced in a single insertion, without repainting
+            # or emitting signals in between
+            self.setUpdatesEnabled(False)
+            self.blockSignals(True)
+            self.clear()
+            self.addItems(names)
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
 
         if not completions:
             self.hide()
@@ -7,41 +7,70 @@ from qtpy.QtWidgets import (
     QAbstractItemView,
     QApplication
 )
-from qtpy.QtCore import Qt, QSortFilterProxyModel, QModelIndex
+from qtpy.QtCore import Qt, QSortFilterProxyModel, QModelIndex, QTimer
 from qtpy.QtGui import QStandardItemModel, QStandardItem
 from .. import settings, themes
 
 logger = logging.getLogger(__name__)
+# The model is populated in chunks of this many items, and the event loop runs
+# in between, so that the dialog is responsive right away for long lists
+POPULATE_CHUNK_SIZE = 512
 
 class MultiNeedleFilterProxyModel(QSortFilterProxyModel):
     """
     Custom proxy model that splits the user input string into
     multiple tokens (space-delimited). Each token must appear
     somewhere in the item text (case-insensitive) for it to match.
+
+    The lowercase names of all items, in the order of the rows, are passed
+    with set_names(). The matching rows are then determined in one go each
+    time the filter changes, so that filterAcceptsRow() only needs to look up
+    the row. When the filter is narrowed, for example by typing another
+    character, only the rows that matched before are checked again.
     """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFilterCaseSensitivity(Qt.CaseInsensitive)
         self._needles = []
+        self._names = []
+        self._matching_rows = None  # None means that all rows match
+
+    def set_names(self, names):
+        self._names = names
+        self._update_matching_rows(narrowed=False)
+        self.invalidateFilter()
 
     def setFilterString(self, text):
         # Split on whitespace to get multiple tokens
-        self._needles = text.strip().split()
+        needles = text.strip().lower().split()
+        # The filter is narrowed if each previous needle is part of a new
+        # needle, because then each name that matches now also matched before
+        narrowed = all(any(old in new for new in needles)
+                       for old in self._needles)
+        self._needles = needles
+        self._update_matching_rows(narrowed)
         self.invalidateFilter()
 
-    def filterAcceptsRow(self, source_row, source_parent):
+    def _update_matching_rows(self, narrowed):
         if not self._needles:
-            return True  # If no input, show all
-        index = self.sourceModel().index(source_row, 0, source_parent)
-        item_text = index.data(Qt.DisplayRole) or ""
-        item_text_lower = item_text.lower()
-
-        # Each needle must be present in the text
-        for needle in self._needles:
-            needle = needle.lower()
-            if needle not in item_text_lower:
-                return False
-        return True
+            self._matching_rows = None  # If no input, show all
+            return
+        names = self._names
+        if narrowed and self._matching_rows is not None:
+            candidates = self._matching_rows
+        else:
+            candidates = range(len(names))
+        # Each needle must be present in the text. The needles are applied one
+        # at a time, so that the test for each row is a single substring check
+        # that is done in C. The longest needle usually rules out the most
+        # rows, so it goes first.
+        for needle in sorted(self._needles, key=len, reverse=True):
+            candidates = {row for row in candidates if needle in names[row]}
+        self._matching_rows = candidates
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self._matching_rows is None or \
+            source_row in self._matching_rows
         
 STYLESHEET = '''
 QuickOpenDialog {{
@@ -80,9 +109,9 @@ class QuickOpenDialog(QDialog):
         color_scheme = themes.THEMES.get(settings.color_scheme)
         if color_scheme:            
             self.setStyleSheet(STYLESHEET.format(
-                background=color_scheme['background_color'],
-                foreground=color_scheme['text_color'],
-                selection_background=color_scheme['selection_background'],
+                background=color_scheme.background_color,
+                foreground=color_scheme.text_color,
+                selection_background=color_scheme.selection_background,
                 font_size=settings.font_size,
                 font_family=settings.font_family
             ))
@@ -106,12 +135,19 @@ class QuickOpenDialog(QDialog):
         layout.addWidget(self._list_view)
 
         self._items = items
+        self._populate_pos = 0
+        self._populate_timer = QTimer(self)
+        self._populate_timer.setSingleShot(True)
+        self._populate_timer.setInterval(0)
+        self._populate_timer.timeout.connect(self._populate_model)
         self._item_model = QStandardItemModel(self)
         self._proxy_model = MultiNeedleFilterProxyModel(self)
         self._proxy_model.setSourceModel(self._item_model)
+        self._proxy_model.set_names(self._lower_names(items))
         self._list_view.setModel(self._proxy_model)
 
-        # Populate the model with items
+        # Populate the model with the first chunk of items. The rest follows
+        # in the background.
         self._populate_model()
 
         # Ensure we select the top item whenever the filter results change
@@ -124,13 +160,36 @@ class QuickOpenDialog(QDialog):
         # Attempt to select top item immediately
         self._select_top_item_if_available()
 
+    def set_items(self, items):
+        """Replaces the items, while keeping the current filter."""
+        self._populate_timer.stop()
+        self._item_model.removeRows(0, self._item_model.rowCount())
+        self._items = items
+        self._proxy_model.set_names(self._lower_names(items))
+        self._populate_pos = 0
+        self._populate_model()
+        self._select_top_item_if_available()
+
+    def _lower_names(self, items):
+        return [item_dict.get("name", "").lower() for item_dict in items]
+
     def _populate_model(self):
-        for item_dict in self._items:
+        """Adds the next chunk of items to the model with a single insertion,
+        and schedules the next chunk if there are items left.
+        """
+        start = self._populate_pos
+        end = start + POPULATE_CHUNK_SIZE
+        rows = []
+        for item_dict in self._items[start:end]:
             name = item_dict.get("name", "")
             item = QStandardItem(name)
             # Store the entire dict in UserRole
             item.setData(item_dict, Qt.UserRole)
-            self._item_model.appendRow(item)
+            rows.append(item)
+        self._item_model.invisibleRootItem().appendRows(rows)
+        self._populate_pos = end
+        if end < len(self._items):
+            self._populate_timer.start()
 
     def _on_item_double_clicked(self, proxy_index: QModelIndex):
         source_index = self._proxy_model.mapToSource(proxy_index)
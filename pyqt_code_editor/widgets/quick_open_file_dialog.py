@@ -11,19 +11,42 @@ class QuickOpenFileDialog(QuickOpenDialog):
     and calls open_file_callback on selection.
     """
     def __init__(self, parent, file_list, open_file_callback):
+        """file_list can be None if the files are not known yet. In that
+        case, the dialog shows that files are being loaded until
+        set_file_list() is called.
+        """
         self.open_file_callback = open_file_callback
+        if file_list is None:
+            items = []
+        else:
+            items = self._file_items(file_list)
+        super().__init__(parent, items, title="Quick Open File")
+        if file_list is None:
+            self._filter_edit.setPlaceholderText("Loading files...")
+
+    def set_file_list(self, file_list):
+        """Shows the files from file_list, while keeping the current filter."""
+        self.set_items(self._file_items(file_list))
+        self._filter_edit.setPlaceholderText("Type to filter...")
+
+    def _file_items(self, file_list):
         items = []
         if file_list:
-            common_prefix = os.path.commonpath(file_list)
-            for full_path in file_list:
-                relative_path = os.path.relpath(full_path, common_prefix)
-                items.append({
-                    "name": relative_path,
-                    "full_path": full_path,
-                })
+            # The paths are normalized absolute paths, so the relative paths
+            # can be found by slicing off the common prefix. This is much
+            # faster than calling os.path.relpath() for each path.
+            if len(file_list) == 1:
+                common_prefix = os.path.dirname(file_list[0])
+            else:
+                common_prefix = os.path.commonpath(file_list)
+            prefix_len = len(common_prefix)
+            if not common_prefix.endswith(os.sep):
+                prefix_len += 1
+            items = [{"name": full_path[prefix_len:], "full_path": full_path}
+                     for full_path in file_list]
         else:
             logger.warning('no files to show')
-        super().__init__(parent, items, title="Quick Open File")
+        return items
 
     def on_item_selected(self, item_dict: dict):
         """Opens the file at item_dict['full_path'] and closes the dialog."""
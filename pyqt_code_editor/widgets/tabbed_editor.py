@@ -222,12 +222,17 @@ class TabbedEditor(QTabWidget):
             
     def _on_modification_changed(self, editor, changed):
         index = self.indexOf(editor)
+        # The editor may have been dragged to another tab widget, which then
+        # updates the tab itself
+        if index < 0:
+            return
         tab_text = self.tabText(index)
+        # The tab text is only set when it changes, because setting it makes
+        # the tab bar recompute its layout
         if editor.modified and not tab_text.endswith(' *'):
-            tab_text += ' *'
+            self.setTabText(index, tab_text + ' *')
         elif not editor.modified and tab_text.endswith(' *'):
-            tab_text = tab_text[:-2]
-        self.setTabText(index, tab_text)
+            self.setTabText(index, tab_text[:-2])
         
     def _on_file_name_changed(self, editor, from_path, to_path):
         """When a file name has changed in such a way that the language has also
@@ -1,14 +1,19 @@
 from ..providers import symbol, codestral, tree_sitter
 
 def complete(code, cursor_pos, path, multiline, full, env_path, prefix):
+    # Codestral runs in the background while the symbols are collected here
     if full or multiline:
-        completions = codestral.codestral_complete(
+        codestral_future = codestral.codestral_complete_async(
             code, cursor_pos, multiline=multiline, prefix=prefix)
     else:
-        completions = []
+        codestral_future = None
     if not multiline:
-        completions += symbol.symbol_complete(code, cursor_pos)
-    return completions
+        symbol_completions = symbol.symbol_complete(code, cursor_pos)
+    else:
+        symbol_completions = []
+    if codestral_future is not None:
+        return codestral_future.result() + symbol_completions
+    return symbol_completions
 
 calltip = None
 check = None
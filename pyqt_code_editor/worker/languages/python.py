@@ -1,18 +1,40 @@
 from ..providers import jedi, codestral, ruff, tree_sitter
+from .. import settings
+
+
+def _jedi_suffices(jedi_completions):
+    """Checks whether jedi found enough completions, in which case there is
+    no need to also ask codestral. This is disabled unless the user sets a
+    threshold.
+    """
+    threshold = settings.codestral_skip_threshold
+    return bool(threshold) and len(jedi_completions) >= threshold
 
 
 def complete(code, cursor_pos, path, multiline, full, env_path, prefix):
+    # Codestral runs in the background while jedi runs here, so that the
+    # latency is that of the slowest provider rather than that of both
     if full or multiline:
-        codestral_completions = codestral.codestral_complete(
+        codestral_future = codestral.codestral_complete_async(
             code, cursor_pos, multiline=multiline, prefix=prefix)
     else:
-        codestral_completions = []
+        codestral_future = None
     if not multiline:
         jedi_completions = jedi.jedi_complete(code, cursor_pos, path=path,
                                               env_path=env_path,
                                               prefix=prefix)
     else:
         jedi_completions = []
+    if codestral_future is not None and _jedi_suffices(jedi_completions):
+        # Jedi's completions make the slow codestral request unnecessary, so
+        # it is cancelled rather than waited for
+        codestral_future.cancel()
+        codestral.cancel_event.set()
+        codestral_future = None
+    if codestral_future is not None:
+        codestral_completions = codestral_future.result()
+    else:
+        codestral_completions = []
     # If there is at least one jedi completion, it is always insert at first.
     # This is to avoid the codestral completion from suddenly replacing the
     # jedi completion that is shown already during the first (non-full) pass
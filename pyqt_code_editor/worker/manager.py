@@ -1,23 +1,67 @@
 import logging
 import time
-from multiprocessing import Process, Queue
+from multiprocessing import Process, Queue, Pipe
 from .process import main_worker_process_function
 from .. import watchdog, settings
+from ..utils import common_prefix_length, common_suffix_length
 logger = logging.getLogger(__name__)
 STOP_UNUSED_INTERVAL = 10
 _last_stop_unused_time = 0
-_workers = {}  # pid -> {"process", "request_queue", "result_queue", "is_free"}
+# pid -> {"process", "request_conn", "result_queue", "is_free", "last_code"}.
+# Requests are sent through the sending end of a one-way pipe, which is
+# written to directly rather than through the feeder thread and lock of a
+# Queue. Results are received through a Queue, because the editor polls it
+# without blocking.
+_workers = {}
 suspended = False
 
 
 def _close_worker_queues(w: dict):
     """Explicitly close a worker's queues to release file descriptors."""
-    for q in (w["request_queue"], w["result_queue"]):
-        try:
-            q.close()
-            q.join_thread()
-        except Exception as e:
-            logger.warning(f"Error closing queue: {e}")
+    w["request_conn"].close()
+    try:
+        w["result_queue"].close()
+        w["result_queue"].join_thread()
+    except Exception as e:
+        logger.warning(f"Error closing queue: {e}")
+
+
+def _encode_code(w: dict, data: dict) -> dict:
+    """Replaces the code of a request by the edit that turns the code that
+    was last sent to the same worker into the new code. The edit is a
+    (start, end, replacement) tuple. Typically only a few characters change
+    between requests, so this keeps requests small even for large files. The
+    worker keeps the last code as well, and applies the edit to it. This is
+    also why the code is not shared through shared memory: only the first
+    request to a worker contains the full code.
+    """
+    code = data.get('code')
+    if code is None:
+        return data
+    last_code = w["last_code"]
+    w["last_code"] = code
+    if last_code is None:
+        return data
+    start = common_prefix_length(last_code, code)
+    length = common_suffix_length(last_code, code,
+                                   min(len(last_code), len(code)) - start)
+    data = data.copy()
+    del data['code']
+    data['code_edit'] = (start, len(last_code) - length,
+                         code[start:len(code) - length])
+    return data
+
+
+def _send(w: dict, data: dict) -> bool:
+    """Sends a request to a worker, and returns False if this failed because
+    the worker has died.
+    """
+    try:
+        w["request_conn"].send(_encode_code(w, data))
+    except OSError as e:
+        logger.warning(f"Error sending request to worker: {e}")
+        return False
+    return True
 
 
 def _cleanup_dead_workers():
@@ -53,34 +97,51 @@ def send_worker_request(**data) -> (Queue, int):
     for pid, w in list(_workers.items()):
         if w["is_free"] and w["process"].is_alive():
             logger.info(f"Reusing free worker {pid} (of {len(_workers)}) for request {list(data.keys())}")
+            if not _send(w, data):
+                continue
             w["is_free"] = False
-            w["request_queue"].put(data)
             return w["result_queue"], pid
 
     # 2. If no free worker was found, create a new one.
-    request_queue = Queue()
+    worker_conn, request_conn = Pipe(duplex=False)
     result_queue = Queue()
     p = Process(target=main_worker_process_function,
-                args=(request_queue, result_queue))
+                args=(worker_conn, result_queue))
     p.start()
     pid = p.pid
     watchdog.register_subprocess(pid)
+    # The receiving end is only used by the worker
+    worker_conn.close()
 
     _workers[pid] = {
         "process": p,
-        "request_queue": request_queue,
+        "request_conn": request_conn,
         "result_queue": result_queue,
         "is_free": False,
+        # The code that was last sent to the worker, see _encode_code()
+        "last_code": None,
     }
 
     logger.info(f"Creating new worker {pid} for request {data['action']}")
     settings_action = {'action': 'set_settings',
                        'settings': {name: value for name, value in settings}}
-    request_queue.put(settings_action)
+    w = _workers[pid]
     # 3. Send the request, return the new worker's result queue and pid.
-    request_queue.put(data)
+    if not (_send(w, settings_action) and _send(w, data)):
+        return None, None
     return result_queue, pid
 
+def cancel_request(pid: int):
+    """
+    Ask a worker process to abort the request that it is handling. Currently,
+    this only aborts codestral completions, which are the slowest. The worker
+    still sends a result, so the caller handles the worker as usual.
+    """
+    w = _workers.get(pid)
+    if w is not None and w["process"].is_alive():
+        logger.info(f"Cancelling request of worker {pid}")
+        _send(w, {"action": "cancel"})
+
 def mark_worker_as_free(pid: int):
     """
     Mark a previously-used worker process (identified by pid)
@@ -130,7 +191,7 @@ def stop_unused_workers(max_free: int = 1, force: bool = False):
         pid = free_pids.pop()
         w = _workers.pop(pid)
         logger.info(f"Stopping free worker {pid} because we have too many.")
-        w["request_queue"].put({"action": "quit"})
+        _send(w, {"action": "quit"})
         w["process"].join()
         _close_worker_queues(w)
         to_stop -= 1
@@ -145,7 +206,7 @@ def stop_all_workers():
     for pid, w in list(_workers.items()):
         if w["process"].is_alive():
             logger.info(f"Stopping worker {pid}.")
-            w["request_queue"].put({"action": "quit"})
+            _send(w, {"action": "quit"})
             w["process"].join()
         _close_worker_queues(w)
         del _workers[pid]
@@ -157,7 +218,7 @@ def update_setting(name, value):
     # Send to all workers
     for pid, w in _workers.items():
         if w["process"].is_alive():
-            w["request_queue"].put(settings_action)            
+            _send(w, settings_action)            
 
 
 def suspend():
@@ -1,23 +1,45 @@
 import logging
 import importlib
-from . import settings
 import queue
+import threading
+from . import settings
+from .providers import codestral
 logger = logging.getLogger(__name__)
 worker_functions_cache = {}
 
 
-def main_worker_process_function(request_queue, result_queue):
+def _receive_requests(request_conn, requests):
+    """Runs in a thread and moves requests from the pipe to a local queue,
+    so that the pipe is also read while a request is being handled. A
+    'cancel' request is therefore received right away, and cancels the
+    codestral request that is in progress, if any.
+    """
+    while True:
+        try:
+            request = request_conn.recv()
+        except EOFError:
+            logger.info("Request pipe was closed. Worker will shut down.")
+            requests.put({'action': 'quit'})
+            break
+        if isinstance(request, dict) and request.get('action') == 'cancel':
+            logger.info("Received 'cancel' action.")
+            codestral.cancel_event.set()
+            continue
+        requests.put(request)
+
+
+def main_worker_process_function(request_conn, result_queue):
     """
     Main worker process for handling editor backend requests.
     
-    Runs in a separate process, continuously processing requests from a queue
-    and sending results back through another queue. Supports code completion,
+    Runs in a separate process, continuously processing requests from a pipe
+    and sending results back through a queue. Supports code completion,
     calltips, symbol extraction, code checking, and settings management.
     
     Parameters
     ----------
-    request_queue : multiprocessing.Queue
-        Queue containing request dictionaries to process
+    request_conn : multiprocessing.connection.Connection
+        Receiving end of a pipe through which request dictionaries are sent
     result_queue : multiprocessing.Queue
         Queue where results are sent back to the main process
         
@@ -28,13 +50,18 @@ def main_worker_process_function(request_queue, result_queue):
     Required fields:
         action : str
             The action to perform. One of: 'complete', 'calltip', 'symbols', 
-            'check', 'set_settings', 'quit', 'matching_brackets'
+            'check', 'set_settings', 'quit', 'matching_brackets', 'cancel'.
+            A 'cancel' request is handled while another request is in
+            progress, and aborts the codestral completion of that request.
     
     Optional fields (depending on action):
         language : str, default 'text'
             Programming language for syntax-aware processing
         code : str, default ''
             Source code content to analyze
+        code_edit : tuple, optional
+            Instead of code, a (start, end, replacement) edit that turns the
+            code of the previous request into the code to analyze
         cursor_pos : int, default 0
             Character position of cursor in the code
         path : str, optional
@@ -47,6 +74,9 @@ def main_worker_process_function(request_queue, result_queue):
             Path to Python environment for context
         prefix : str, optional
             Prefix string for filtering results
+        revision : int, optional
+            Revision of the editor's text, which is passed back with the
+            result of 'complete' and 'calltip' actions
         settings : dict, optional
             Settings to update (only for 'set_settings' action)
     
@@ -60,14 +90,16 @@ def main_worker_process_function(request_queue, result_queue):
             'completions': list or None,
             'cursor_pos': int,
             'multiline': bool,
-            'full': bool
+            'full': bool,
+            'revision': int or None
         }
     
     For 'calltip' action:
         {
             'action': 'calltip', 
             'signatures': list or None,
-            'cursor_pos': int
+            'cursor_pos': int,
+            'revision': int or None
         }
     
     For 'symbols' action:
@@ -108,11 +140,17 @@ def main_worker_process_function(request_queue, result_queue):
     subpackage.
     """
     logger.info("Started completion worker.")
+    # Requests contain either the full code, or an edit of the code from the
+    # previous request. See manager._encode_code().
+    last_code = ''
+    requests = queue.Queue()
+    threading.Thread(target=_receive_requests, args=(request_conn, requests),
+                     daemon=True).start()
     while True:
-        try:
-            request = request_queue.get(True, 5)
-        except queue.Empty:
-            continue
+        request = requests.get()
+        # A cancel request only applies to the request that was in progress
+        # when it was received
+        codestral.cancel_event.clear()
         if request is None:
             logger.info("Received None request (possibly legacy or invalid). Skipping.")
             continue
@@ -124,13 +162,21 @@ def main_worker_process_function(request_queue, result_queue):
         # here.
         action = request.get('action', None)
         language = request.get('language', 'text')
-        code = request.get('code', '')
+        if 'code_edit' in request:
+            start, end, replacement = request['code_edit']
+            last_code = last_code[:start] + replacement + last_code[end:]
+            code = last_code
+        elif 'code' in request:
+            code = last_code = request['code']
+        else:
+            code = ''
         cursor_pos = request.get('cursor_pos', 0)
         path = request.get('path', None)
         multiline = request.get('multiline', False)
         full = request.get('full', False)
         env_path = request.get('env_path', None)
         prefix = request.get('prefix', None)
+        revision = request.get('revision', None)
         if action is None:
             logger.info("Request is missing 'action' field. Skipping.")
             continue
@@ -139,6 +185,8 @@ def main_worker_process_function(request_queue, result_queue):
         if action == 'set_settings':
             for name, value in request.get('settings', {}).items():
                 setattr(settings, name, value)
+            if 'codestral_api_key' in request.get('settings', {}):
+                codestral.warm_up()
             continue
         if action == 'quit':
             logger.info("Received 'quit' action. Worker will shut down.")
@@ -177,7 +225,8 @@ def main_worker_process_function(request_queue, result_queue):
                 'completions': completions,
                 'cursor_pos': cursor_pos,
                 'multiline': multiline,
-                'full': full
+                'full': full,
+                'revision': revision
             })
 
         elif action == 'calltip':
@@ -195,7 +244,8 @@ def main_worker_process_function(request_queue, result_queue):
             result_queue.put({
                 'action': 'calltip',
                 'signatures': signatures,
-                'cursor_pos': cursor_pos
+                'cursor_pos': cursor_pos,
+                'revision': revision
             })
                 
         elif action == 'symbols':
@@ -1,21 +1,51 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .. import settings
 
 logger = logging.getLogger(__name__)
+# The client is created once and then reused, so that its connection to the
+# server is kept open between requests. It is recreated if the API key
+# changes. The lock makes sure that it is only created once when it is needed
+# by multiple threads at the same time.
 client = None
+client_api_key = None
+client_lock = threading.Lock()
+# Codestral requests are network calls, which can be made in a background
+# thread so that local completions can be computed in the meantime. A single
+# thread is enough, because only one completion request is handled at a time.
+executor = ThreadPoolExecutor(max_workers=1)
+# Set by the worker process when the editor cancels the request in progress.
+# The completion is streamed, and reading the stream stops as soon as this is
+# set, which closes the connection.
+cancel_event = threading.Event()
+
+
+def _get_client():
+    global client, client_api_key
+    with client_lock:
+        if client is None or client_api_key != settings.codestral_api_key:
+            from mistralai import Mistral
+            client = Mistral(api_key=settings.codestral_api_key)
+            client_api_key = settings.codestral_api_key
+        return client
+
+
+def warm_up():
+    """Creates the client in the background, so that the first completion
+    doesn't have to wait for mistralai to be imported. This is called by the
+    worker process when the API key has been set.
+    """
+    if settings.codestral_api_key:
+        executor.submit(_get_client)
 
 
 def codestral_complete(code: str, cursor_pos: int,
                        multiline: bool = False,
                        prefix: str | None = None) -> list[str]:
-    global client
-
     if not settings.codestral_api_key:
         return []
-
-    if client is None:
-        from mistralai import Mistral
-        client = Mistral(api_key=settings.codestral_api_key)
+    client = _get_client()
 
     if len(code) < settings.codestral_min_context:
         return []
@@ -41,21 +71,33 @@ def codestral_complete(code: str, cursor_pos: int,
     if not multiline:
         request["stop"] = "\n"
 
+    if cancel_event.is_set():
+        logger.info("Codestral request cancelled")
+        return []
+    completion = ''
     try:
-        response = client.fim.complete(**request)
+        with client.fim.stream(**request) as stream:
+            for event in stream:
+                if cancel_event.is_set():
+                    logger.info("Codestral request cancelled")
+                    return []
+                if event.data.choices:
+                    content = event.data.choices[0].delta.content
+                    if isinstance(content, str):
+                        completion += content
     except Exception as e:
         logger.info(f"Codestral exception: {e}")
         return []
 
-    if response.choices:
-        completion = response.choices[0].message.content
+    if completion:
         logger.info(f"Codestral completion: {completion}")
-        if completion:
-            return [{'completion' : completion, 'name': completion}]
-        else:
-            logger.info("Codestral completion: [empty]")
-    else:
-        logger.info("Codestral completion: [none]")
-
+        return [{'completion' : completion, 'name': completion}]
+    logger.info("Codestral completion: [empty]")
     return []
-    
+
+
+def codestral_complete_async(*args, **kwargs):
+    """Calls codestral_complete() in a background thread and returns a Future
+    for the result.
+    """
+    return executor.submit(codestral_complete, *args, **kwargs)
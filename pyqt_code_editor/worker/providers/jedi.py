@@ -1,10 +1,32 @@
 import re
+import string
+import functools
+import os
 import logging
+from collections import OrderedDict
+from itertools import islice
 import jedi
 from .. import settings
 
 logger = logging.getLogger(__name__)
 env_cache = {}
+# The jedi project for each folder. When no project is passed, jedi.Script
+# looks for the project root itself, by checking for a number of files in
+# each parent folder. This would otherwise happen for each new script, and
+# thus on nearly every keystroke.
+project_cache = {}
+# The most recent jedi.Script for each of the most recently used files, as
+# (path, env_path) -> (code, script), with the least recently used first. A
+# completion and a calltip are often requested for the same code, also when
+# switching between files, and then the script, including the state that jedi
+# has already resolved, is reused. Only the most recent script is kept per
+# file, because parso updates the syntax tree of the previous script of the
+# same file when it parses a new version of it.
+script_cache = OrderedDict()
+# Completion is only attempted after these characters. This is checked on
+# every keystroke, so a set lookup is used rather than a regular expression.
+TRIGGER_CHARS = frozenset(string.ascii_letters + string.digits + '_.')
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
 
 
 def _estimate_width(text):
@@ -12,7 +34,7 @@ def _estimate_width(text):
     (rough approximation)
     """
     # Remove HTML tags for width calculation
-    clean_text = re.sub(r'<[^>]+>', '', text)
+    clean_text = HTML_TAG_PATTERN.sub('', text)
     return len(clean_text)
 
 
@@ -46,15 +68,21 @@ def _wrap_params(params, width_limit):
 
 def _signature_to_html(signature, max_width: int, max_lines: int) -> str:
     """Convert jedi.Script.get_signatures() output to nicely formatted HTML."""
-    param_strs = []
-    for param in signature.params:
-        param_strs.append(param.to_string())
-    
+    param_strs = tuple(param.to_string() for param in signature.params)
     # Get return annotation if available
     return_hint = ""
-    if hasattr(signature, "annotation_string") and signature.annotation_string:
+    if getattr(signature, "annotation_string", None):
         return_hint = f" -> {signature.annotation_string}"
-    
+    return _format_signature(param_strs, return_hint, max_width, max_lines)
+
+
+@functools.lru_cache(maxsize=64)
+def _format_signature(param_strs: tuple, return_hint: str, max_width: int,
+                      max_lines: int) -> str:
+    """Formats the parameters and the return hint of a signature as HTML. The
+    result is cached, because the same signatures are shown again and again
+    while the arguments of a call are typed.
+    """
     # Wrap parameters based on max_width
     wrapped_lines = _wrap_params(param_strs,
                                  max_width - _estimate_width(return_hint) - 2)
@@ -80,6 +108,16 @@ def _signature_to_html(signature, max_width: int, max_lines: int) -> str:
         return "".join(html_lines)
 
 
+def _get_project(path: str | None):
+    """Returns the jedi project for the folder of the file, in the same way
+    that jedi.Script determines it, but only once for each folder.
+    """
+    folder = os.path.dirname(os.path.abspath(path)) if path else None
+    if folder not in project_cache:
+        project_cache[folder] = jedi.get_default_project(folder)
+    return project_cache[folder]
+
+
 def _prepare_jedi_script(code: str, cursor_position: int, path: str | None,
                          env_path: str | None, prefix: str | None = None):
     """
@@ -91,15 +129,16 @@ def _prepare_jedi_script(code: str, cursor_position: int, path: str | None,
             prefix += '\n'
         code = prefix + code
         cursor_position += len(prefix)
-    # Convert the flat cursor_position into line & column (1-based indexing for Jedi)
-    line_no = code[:cursor_position].count('\n') + 1
-    last_newline_idx = code.rfind('\n', 0, cursor_position)
-    if last_newline_idx < 0:
-        column_no = cursor_position
-    else:
-        column_no = cursor_position - (last_newline_idx + 1)
-    logger.info("Creating Jedi Script for path=%r at line=%d, column=%d",
-             path, line_no, column_no)
+    # Convert the flat cursor_position into line & column (1-based indexing
+    # for Jedi). Both searches are bounded by the cursor position, so that the
+    # code before the cursor isn't copied. If there is no newline, rfind()
+    # returns -1, and the column is the cursor position itself.
+    line_no = code.count('\n', 0, cursor_position) + 1
+    column_no = cursor_position - (code.rfind('\n', 0, cursor_position) + 1)
+    # This is logged for every keystroke, so it is logged at the debug level,
+    # and the arguments are only formatted when that level is enabled.
+    logger.debug("Creating Jedi Script for path=%r at line=%d, column=%d",
+                 path, line_no, column_no)
     # We explicitly indicate that the environment is safe, because we know that
     # they come from the app itself
     if env_path not in env_cache:        
@@ -107,7 +146,18 @@ def _prepare_jedi_script(code: str, cursor_position: int, path: str | None,
         env_cache[env_path] = env
     else:
         env = env_cache[env_path]
-    script = jedi.Script(code, path=path, environment=env)
+    key = path, env_path
+    cached = script_cache.get(key)
+    if cached is not None and cached[0] == code:
+        script = cached[1]
+        script_cache.move_to_end(key)
+    else:
+        script = jedi.Script(code, path=path, environment=env,
+                             project=_get_project(path))
+        script_cache[key] = code, script
+        script_cache.move_to_end(key)
+        while len(script_cache) > settings.jedi_script_cache_size:
+            script_cache.popitem(last=False)
     return script, line_no, column_no
 
 
@@ -123,23 +173,23 @@ def jedi_complete(code: str, cursor_position: int, path: str | None,
     # Basic sanity check for whether we want to attempt completion.
     char_before = code[cursor_position - 1]
     # Typically, you'd allow '.', '_' or alphanumeric as a signal for completion
-    if not re.match(r"[A-Za-z0-9_.]", char_before):
+    if char_before not in TRIGGER_CHARS:
         return []
     # If the first preceding # comes before the first preceding newline, then we're inside a code comment
-    code_up_to_cursor = code[:cursor_position]
-    if code_up_to_cursor.rfind('#') > code_up_to_cursor.rfind('\n'):
+    if code.rfind('#', 0, cursor_position) > \
+            code.rfind('\n', 0, cursor_position):
         return []
     # Go Jedi!
     script, line_no, column_no = _prepare_jedi_script(code, cursor_position,
                                                       path, env_path, prefix)
     completions = script.complete(line=line_no, column=column_no)
-    if not completions:
-        return []
-    result = [
+    # The result is sent back to the editor through a pipe, so it needs to be
+    # a list. The completions are taken with islice() so that jedi's list of
+    # completions, which can be long, isn't copied.
+    return [
         {'completion' : c.complete, 'name': c.name}
-        for c in completions[:settings.max_completions] if c.complete
+        for c in islice(completions, settings.max_completions) if c.complete
     ]
-    return result or []
 
 
 def jedi_signatures(code: str, cursor_position: int, path: str | None,
@@ -155,23 +205,23 @@ def jedi_signatures(code: str, cursor_position: int, path: str | None,
       2) The docstring is wrapped to max_width columns and truncated to max_lines lines.
     """
     if cursor_position == 0 or not code:
-        logger.info("No code or cursor_position=0; cannot fetch calltip.")
+        logger.debug("No code or cursor_position=0; cannot fetch calltip.")
         return None
 
-    logger.info("Starting Jedi calltip request")
+    logger.debug("Starting Jedi calltip request")
     script, line_no, column_no = _prepare_jedi_script(code, cursor_position,
                                                       path, env_path, prefix)
 
     signatures = script.get_signatures(line=line_no, column=column_no)
     if not signatures:
-        logger.info("No signatures returned by Jedi.")
+        logger.debug("No signatures returned by Jedi.")
         return None
 
     results = []
     for sig in signatures:
         results.append(_signature_to_html(sig, max_width, max_lines))
 
-    logger.info("Got %d signature(s) from Jedi.", len(results))
+    logger.debug("Got %d signature(s) from Jedi.", len(results))
     return results or None
 
 
@@ -1,4 +1,70 @@
 import re
+import string
+import bisect
+from collections import Counter
+from ...utils import common_prefix_length, common_suffix_length
+
+# Identifier characters are checked one at a time with a set lookup, which is
+# cheaper than calling into the regular-expression engine for each character
+IDENT_CHARS = frozenset(string.ascii_letters + string.digits + '_')
+IDENT_WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+# The number of times that each word occurs in the code that was passed last.
+# Typically only a few characters change between calls, and then only the
+# words around the changed part are counted again.
+# The words are also kept in a sorted list, so that the words that start with
+# the word that is being typed can be looked up with a binary search.
+last_code = None
+word_counts = Counter()
+sorted_words = []
+
+
+def _add_words(text: str):
+    words = IDENT_WORD_PATTERN.findall(text)
+    new_words = {word for word in words if word not in word_counts}
+    # Counter.update() counts the words in C
+    word_counts.update(words)
+    for word in new_words:
+        bisect.insort(sorted_words, word)
+
+
+def _remove_words(text: str):
+    # Words that no longer occur are removed, so that they are not suggested
+    for word in IDENT_WORD_PATTERN.findall(text):
+        count = word_counts[word] - 1
+        if count:
+            word_counts[word] = count
+        else:
+            del word_counts[word]
+            del sorted_words[bisect.bisect_left(sorted_words, word)]
+
+
+def _update_word_counts(code: str):
+    global last_code
+    if code == last_code:
+        return
+    if last_code is not None:
+        start = common_prefix_length(last_code, code)
+        suffix_length = common_suffix_length(
+            last_code, code, min(len(last_code), len(code)) - start)
+        changed = max(len(last_code), len(code)) - start - suffix_length
+    # For large changes, counting all words again is just as fast
+    if last_code is None or changed > len(code) // 2:
+        word_counts.clear()
+        word_counts.update(IDENT_WORD_PATTERN.findall(code))
+        sorted_words[:] = sorted(word_counts)
+        last_code = code
+        return
+    # The changed part is extended to the nearest word boundaries, which are
+    # the same in the old and the new code, because the characters around
+    # the changed part are the same
+    while start > 0 and code[start - 1] in IDENT_CHARS:
+        start -= 1
+    while suffix_length > 0 and code[-suffix_length] in IDENT_CHARS:
+        suffix_length -= 1
+    _remove_words(last_code[start:len(last_code) - suffix_length])
+    _add_words(code[start:len(code) - suffix_length])
+    last_code = code
+
 
 def symbol_complete(code: str, cursor_pos: int) -> list[str]:
     """
@@ -23,56 +89,73 @@ def symbol_complete(code: str, cursor_pos: int) -> list[str]:
     # Check the character immediately before the cursor
     char_before = code[cursor_pos - 1]
     # If the character is not alphanumeric or underscore, no completion
-    if not re.match(r"[A-Za-z0-9_]", char_before):
+    if char_before not in IDENT_CHARS:
         return []
 
-    # Find the partial word by reading backwards from cursor_pos
+    # Find the partial word by walking back from the cursor, so that only the
+    # partial word itself is looked at, and the code isn't copied
     start_index = cursor_pos - 1
-    while start_index >= 0 and re.match(r"[A-Za-z0-9_]", code[start_index]):
+    while start_index >= 0 and code[start_index] in IDENT_CHARS:
         start_index -= 1
     partial_word = code[start_index + 1:cursor_pos]
     if not partial_word:
         return []
 
-    # Remove the user-typed partial_word from the code where it appears near the cursor
-    code_without_partial = code[:start_index + 1] + code[cursor_pos:]
+    # The user-typed partial_word is not counted as a symbol. If the cursor
+    # is inside a word, the word is split at the cursor, so that only the part
+    # after the cursor remains.
+    _update_word_counts(code)
+    end_index = cursor_pos
+    while end_index < len(code) and code[end_index] in IDENT_CHARS:
+        end_index += 1
+    current_word = code[start_index + 1:end_index]
+    remaining_word = code[cursor_pos:end_index]
 
-    # Gather all words (symbols) from the updated code
-    all_symbols = re.findall(r"[A-Za-z0-9_]+", code_without_partial)
-    unique_symbols = set(all_symbols)  # deduplicate
+    def is_symbol(sym):
+        count = word_counts.get(sym, 0) - (sym == current_word)
+        return count > 0 or sym == remaining_word
 
     # Filter only those symbols that:
     # 1) start with partial_word
     # 2) are strictly longer than partial_word
-    matches = [sym for sym in unique_symbols
-               if sym.startswith(partial_word) and len(sym) > len(partial_word)]
-    if not matches:
-        return []
-
-    # Build leftover_map { leftover_length -> list_of_symbols }
-    leftover_map = {}
-    for sym in matches:
-        leftover_len = len(sym) - len(partial_word)
-        leftover_map.setdefault(leftover_len, []).append(sym)
+    # The words that start with partial_word are next to each other in the
+    # sorted list, and the other checks are only done for these words, in the
+    # loop below. Words only consist of identifier characters, which all sort
+    # before '\x7f', so this marks the end of the words with this start.
+    first = bisect.bisect_left(sorted_words, partial_word)
+    last = bisect.bisect_left(sorted_words, partial_word + '\x7f', first)
+    candidates = sorted_words[first:last]
+    if remaining_word.startswith(partial_word) and \
+            remaining_word not in word_counts:
+        candidates.append(remaining_word)
 
     # Check if partial_word is itself a symbol (i.e. it appears elsewhere in the code)
-    partial_word_is_symbol = partial_word in unique_symbols
+    partial_word_is_symbol = is_symbol(partial_word)
 
-    if partial_word_is_symbol:
-        # Pick from the group with the maximum leftover
-        max_leftover_len = max(leftover_map)
-        candidates = leftover_map[max_leftover_len]
+    # In a single pass over the matches, find the match with the largest
+    # leftover, and the match with a leftover of 1. Ties are broken by
+    # picking the lexicographically first.
+    longest_match = None
+    one_longer_match = None
+    for sym in candidates:
+        if len(sym) <= len(partial_word) or not is_symbol(sym):
+            continue
+        if longest_match is None or len(sym) > len(longest_match) or \
+                (len(sym) == len(longest_match) and sym < longest_match):
+            longest_match = sym
+        if len(sym) == len(partial_word) + 1 and \
+                (one_longer_match is None or sym < one_longer_match):
+            one_longer_match = sym
+    if longest_match is None:
+        return []
+
+    if partial_word_is_symbol or one_longer_match is None:
+        # Pick the match with the maximum leftover
+        best_match = longest_match
     else:
-        # If there's a leftover=1 group available, pick that
-        if 1 in leftover_map:
-            candidates = leftover_map[1]
-        else:
-            # Otherwise pick from the group with the maximum leftover
-            max_leftover_len = max(leftover_map)
-            candidates = leftover_map[max_leftover_len]
+        # If there's a match with leftover=1, pick that
+        best_match = one_longer_match
 
-    # Among candidates, pick the lexicographically first
-    best_match = min(candidates)
     # The remainder is the substring that goes beyond the partial_word
     remainder = best_match[len(partial_word):]
     return [{'completion' : remainder, 'name': best_match}]
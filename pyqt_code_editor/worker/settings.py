@@ -1 +1,6 @@
-# This is an empty module that will be filled with settings
+# This is an empty module that will be filled with settings. It is not a copy
+# of pyqt_code_editor._settings, which is the single source of truth for all
+# settings. The worker process doesn't import that module, because it depends
+# on Qt. Instead, the main process sends all setting values to the worker
+# through a 'set_settings' request, and these are then set as attributes of
+# this module.
@@ -1,5 +1,6 @@
 import re
 import textwrap
+from functools import lru_cache
 from pyqt_code_editor.utils.languages.python import _auto_indent as python_utils
 
 
@@ -19,60 +20,52 @@ def parse_autoindent_test_cases(test_cases: str) -> list[dict]:
     but with the '>' removed. The 'n_space' is how many leading spaces appear
     on the next line (the one containing '|').
     """
-    # We'll split by triple-backtick code blocks and capture
-    # the text in between for descriptions.
-    parts = re.split(r"```(.*?)```", test_cases, flags=re.DOTALL)
-
-    # The split results in a list where even indices (0, 2, 4, ...)
-    # are text outside of code blocks, and odd indices (1, 3, 5, ...)
-    # are the code blocks themselves.
-    # For each code block at index i, the preceding text is at index i-1.
-
+    # A single pass over the code blocks. The text between the end of the
+    # previous code block and the start of the current one holds the
+    # description.
     results = []
-    # We accumulate descriptions from the preceding text.
-    for i in range(1, len(parts), 2):
-        code_block = parts[i]
-        preceding_text = parts[i - 1].rstrip()  # text in the preceding part
-        # The last non-empty line of preceding_text is the description
-        description_lines = preceding_text.split('\n')
-        # Find the last line that isn't just whitespace
-        desc_line = ""
-        for line in reversed(description_lines):
-            if line.strip():
-                desc_line = line.strip()
-                break
-        lines = code_block.splitlines()
-        code_lines = []
+    last_end = 0
+    for match in re.finditer(r"```(.*?)```", test_cases, flags=re.DOTALL):
+        # The last non-empty line of the preceding text is the description.
+        # After stripping trailing whitespace, this is simply the last line.
+        preceding_text = test_cases[last_end:match.start()].rstrip()
+        desc_line = preceding_text[preceding_text.rfind('\n') + 1:].strip()
+        last_end = match.end()
+        # The code runs until the end of the first line that contains a '>'.
+        # The code block is scanned in place, without splitting it into lines.
+        code_block = match.group(1)
         n_space = 0
-        idx = 0
-        while idx < len(lines):
-            line = lines[idx]
-            if '>' in line:
-                # Remove the '>' to reconstruct actual code
-                line_without_arrow = line.replace('>', '')
-                code_lines.append(line_without_arrow)
-
-                # The next line should have '|' with possible indentation
-                idx += 1
-                if idx < len(lines):
-                    next_line = lines[idx]
-                    # Count leading spaces
-                    leading_spaces = len(next_line) - len(next_line.lstrip(' '))
-                    n_space = leading_spaces
-                break
-            else:
-                code_lines.append(line)
-            idx += 1
-
-        code_str = "\n".join(code_lines)
-
+        arrow = code_block.find('>')
+        if arrow == -1:
+            code = code_block[:-1] if code_block.endswith('\n') \
+                else code_block
+        else:
+            line_end = code_block.find('\n', arrow)
+            if line_end == -1:
+                line_end = len(code_block)
+            # Remove the '>' to reconstruct actual code
+            code = code_block[:line_end].replace('>', '')
+            # The next line should have '|' with possible indentation, so we
+            # count its leading spaces
+            next_start = pos = line_end + 1
+            while pos < len(code_block) and code_block[pos] == ' ':
+                pos += 1
+            n_space = max(pos - next_start, 0)
         results.append({
             "description": desc_line,
-            "code": code_str,
+            "code": code,
             "n_space": n_space
         })
 
     return results
+
+
+@lru_cache(maxsize=None)
+def docstring_test_cases(docstring: str) -> tuple[dict, ...]:
+    """Dedents and parses a docstring with test cases. Docstrings don't
+    change, so each is parsed only once per session.
+    """
+    return tuple(parse_autoindent_test_cases(textwrap.dedent(docstring)))
    
     
 def test_utils(assert_pass=True):
@@ -83,8 +76,7 @@ def test_utils(assert_pass=True):
         python_utils._indent_after_list_tuple_set_or_dict,
         python_utils.python_auto_indent,
     ]:
-        markdown_test_cases = textwrap.dedent(fnc.__doc__)
-        test_cases = parse_autoindent_test_cases(markdown_test_cases)
+        test_cases = docstring_test_cases(fnc.__doc__)
         total = 0
         passed = 0
         for test_case in test_cases: